@@ -1,145 +1,175 @@
-from flask import Flask, render_template, request, session, Response, send_file, make_response
-from modules.scraper import find_policy_links, get_text_from_url
-from modules.analyzer import analyze_policy_text
-from modules.pdf_generator import create_report
-from gtts import gTTS, gTTSError
-from io import BytesIO
+"""
+PolicyGuard web app. create_app() builds the Flask app; each subsystem
+(scraping and analysis, PDF reports, text-to-speech, batches) is imported
+by the first request that uses it, so a worker is ready to serve as soon as
+Flask itself is loaded.
+"""
+from modules import load_env
+
+# Modules read their settings when first imported, so .env is loaded first
+load_env()
+
+from flask import Flask, render_template, request, session, Response, send_file, make_response, jsonify, redirect, g
+from modules.jobs import JobQueue
+from modules.results import load_result
+from modules import metrics, tts, web
 import os
+import time
 import logging
-import requests
-from urllib.parse import urlparse, urljoin
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'a_very_secret_key_for_development'
+def _run_analysis(*args, **kwargs):
+    from modules.pipeline import run_analysis
+    return run_analysis(*args, **kwargs)
 
-# Add session configuration
-app.config.update(
-    SESSION_COOKIE_SECURE=True,
-    SESSION_COOKIE_HTTPONLY=True,
-    SESSION_COOKIE_SAMESITE='Lax',
-    PERMANENT_SESSION_LIFETIME=1800  # 30 minutes
-)
-
-def validate_url(url):
-    """Validate and clean URL"""
-    try:
-        result = urlparse(url)
-        if not result.scheme:
-            url = 'https://' + url
-        response = requests.head(url, allow_redirects=True)
-        return response.url
-    except Exception as e:
-        logger.error(f"URL validation error: {e}")
-        return None
+job_queue = JobQueue(_run_analysis, max_workers=int(os.getenv("ANALYSIS_WORKERS", 4)))
 
-def setup_fonts():
-    """Set up the fonts directory with fallback options"""
-    try:
-        fonts_dir = os.path.join(os.path.dirname(__file__), 'fonts')
-        os.makedirs(fonts_dir, exist_ok=True)
-        
-        # List of potential system fonts
-        system_fonts = [
-            "C:\\Windows\\Fonts\\arial.ttf",
-            "C:\\Windows\\Fonts\\calibri.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        ]
-        
-        for system_font in system_fonts:
-            if os.path.exists(system_font):
-                dest_path = os.path.join(fonts_dir, os.path.basename(system_font))
-                if not os.path.exists(dest_path):
-                    import shutil
-                    shutil.copy2(system_font, dest_path)
-                return True
-                
-        logger.warning("No system fonts found. Using default font.")
-        return False
-    except Exception as e:
-        logger.error(f"Font setup error: {e}")
-        return False
-
-@app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         url = request.form['url']
         language = request.form['language']
         
         try:
-            # Validate and clean URL
-            valid_url = validate_url(url)
-            if not valid_url:
-                return render_template('index.html', 
-                    error="Invalid URL. Please enter a valid website address.")
-            
-            logger.info(f"Finding policy links for: {valid_url}")
-            policy_links = find_policy_links(valid_url)
-            logger.info(f"Found policy links: {policy_links}")
-            
-            if not policy_links:
-                logger.warning("No policy links found, using provided URL")
-                policy_links = [valid_url]
-                
-            policy_text = None
-            for link in policy_links:
-                logger.info(f"Trying to extract text from: {link}")
-                policy_text = get_text_from_url(link)
-                if policy_text:
-                    break
-            
-            if not policy_text:
-                return render_template('index.html', 
-                    error="Could not extract policy text. Please check the website or try a different URL.")
-            
-            logger.info(f"Analyzing text of length: {len(policy_text)}")
-            analysis_result = analyze_policy_text(policy_text, language)
-            
-            if 'error' in analysis_result:
-                return render_template('index.html', error=analysis_result['error'])
+            result = _run_analysis(url, language)
+            if 'error' in result:
+                return render_template('index.html', error=result['error'])
             
-            # Store complete analysis data in session
-            session['analysis_data'] = {
-                'url': valid_url,
-                'language': language,
-                'analysis': {
-                    'risk_category': analysis_result.get('risk_category', ''),
-                    'translated_summary': analysis_result.get('translated_summary', ''),
-                    'translated_key_risks': analysis_result.get('translated_key_risks', [])
-                }
-            }
-            
-            return render_template('index.html', result=session['analysis_data'])
+            # Only the id goes in the cookie; the analysis lives server-side
+            session['analysis_id'] = result['id']
+            return render_template('index.html', result=result)
             
         except Exception as e:
             logger.error(f"Error processing request: {str(e)}", exc_info=True)
             return render_template('index.html', 
                 error="An error occurred while processing your request. Please try again.")
 
+    job_id = request.args.get('job')
+    if job_id:
+        job = job_queue.get(job_id)
+        if not job or not job.finished:
+            return render_template('index.html', error="Analysis not found or still running. Please try again.")
+        if job.status == 'failed':
+            return render_template('index.html', error=job.error)
+        session['analysis_id'] = job.result['id']
+        return render_template('index.html', result=job.result)
+
     return render_template('index.html', result=None)
 
-@app.route('/download_pdf')
+def result_permalink(analysis_id):
+    """
+    Shows a stored analysis without re-running it; ?language= switches it to
+    another language by translating only its summary and risks.
+    """
+    result = load_result(analysis_id)
+    if not result:
+        return render_template('index.html', error="This analysis has expired or does not exist. Please analyze the website again."), 404
+
+    language = request.args.get('language')
+    if language and language != result['language']:
+        if language not in tts.LANGUAGE_CODES:
+            return render_template('index.html', error="Unsupported language."), 400
+        from modules.pipeline import translate_result
+        translated = translate_result(result, [language])
+        if 'error' in translated:
+            return render_template('index.html', error=translated['error'])
+        return redirect(f"/result/{translated[language]['id']}")
+
+    session['analysis_id'] = analysis_id
+    return render_template('index.html', result=result)
+
+def translate():
+    """Translates a stored analysis into several languages in one model call."""
+    data = request.get_json(silent=True) or {}
+    result = load_result(data.get('id'))
+    if not result:
+        return jsonify({'error': 'Analysis not found'}), 404
+    languages = data.get('languages') or []
+    unsupported = [language for language in languages if language not in tts.LANGUAGE_CODES]
+    if not languages or unsupported:
+        return jsonify({'error': f"Choose languages from: {', '.join(tts.LANGUAGE_CODES)}"}), 400
+
+    from modules.pipeline import translate_result
+    translated = translate_result(result, languages)
+    if 'error' in translated:
+        return jsonify(translated), 502
+    return jsonify({language: {'id': copy['id'], **copy['analysis']}
+                    for language, copy in translated.items()})
+
+def submit_analysis():
+    data = request.get_json(silent=True) or request.form
+    url = (data.get('url') or '').strip()
+    language = data.get('language') or 'English'
+    if not url:
+        return jsonify({'error': 'A website URL is required.'}), 400
+
+    job = job_queue.submit(url, language)
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+def job_events(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return Response(web.job_event_stream(job), mimetype='text/event-stream', headers=web.EVENT_STREAM_HEADERS)
+
+def batch_analyze():
+    """
+    Analyzes a list of URLs and streams one record per site as it finishes,
+    as JSON Lines or CSV. Posting the same list again resumes the batch.
+    """
+    from modules import batch
+    data = request.get_json(silent=True) or {}
+    urls = batch.clean_urls(data.get('urls') or [])
+    language = data.get('language', 'English')
+    output_format = data.get('format', 'jsonl')
+    if not urls:
+        return jsonify({'error': 'Please provide a list of URLs'}), 400
+    if len(urls) > batch.BATCH_MAX_URLS:
+        return jsonify({'error': f'At most {batch.BATCH_MAX_URLS} URLs per batch'}), 400
+    if output_format not in ('jsonl', 'csv'):
+        return jsonify({'error': "format must be 'jsonl' or 'csv'"}), 400
+
+    def stream():
+        if output_format == 'csv':
+            yield batch.format_csv()
+        formatter = batch.format_csv if output_format == 'csv' else batch.format_jsonl
+        for record in batch.run_batch(urls, language, resume=data.get('resume', True)):
+            yield formatter(record)
+
+    return Response(stream(), mimetype='text/csv' if output_format == 'csv' else 'application/x-ndjson', headers={
+        'X-Batch-Id': batch.batch_id(urls, language),
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 def download_pdf():
+    from modules.pdf_generator import get_report, report_key
     try:
-        # Get complete analysis data from session
-        analysis_data = session.get('analysis_data')
+        # Look up the analysis by explicit id, falling back to the session's
+        analysis_data = load_result(request.args.get('id') or session.get('analysis_id'))
         
         if not analysis_data:
-            logger.error("No analysis data in session")
+            logger.error("No stored analysis for this request")
             return "Please analyze a policy first.", 400
         
+        # Reports never change for a given analysis and language
+        etag = report_key(analysis_data)
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+        
         logger.info("Generating PDF report...")
-        logger.debug(f"Analysis data: {analysis_data}")
         
-        # Generate PDF with error handling
-        pdf_bytes = create_report(
-            analysis_data['analysis'],
-            analysis_data['url'],
-            analysis_data['language']
-        )
+        # Rendered in the background when the analysis finished, usually cached
+        pdf_bytes = get_report(analysis_data)
         
         if not pdf_bytes:
             logger.error("PDF generation returned None")
@@ -151,10 +181,9 @@ def download_pdf():
             'Content-Type': 'application/pdf',
             'Content-Disposition': 'attachment; filename=policy_analysis.pdf',
             'Content-Length': len(pdf_bytes),
-            'Cache-Control': 'no-cache, no-store, must-revalidate',
-            'Pragma': 'no-cache',
-            'Expires': '0'
+            'Cache-Control': 'private, max-age=86400'
         })
+        response.set_etag(etag)
         
         logger.info("PDF generated successfully")
         return response
@@ -163,75 +192,138 @@ def download_pdf():
         logger.error(f"Download PDF error: {str(e)}", exc_info=True)
         return "An error occurred while generating the PDF.", 500
 
-@app.route('/text-to-speech', methods=['POST'])
 def text_to_speech():
     data = request.json
     text = data.get('text', '')
-    language = data.get('language', 'en')
-    
-    language_map = {
-        'English': 'en',
-        'Hindi': 'hi',
-        'Bengali': 'bn',
-        'Tamil': 'ta',
-        'Telugu': 'te',
-        'Malayalam': 'ml',
-        'Urdu': 'ur',
-        'French': 'fr',
-        'Russian': 'ru',
-        'Spanish': 'es',
-        'German': 'de'
-    }
-    
-    lang_code = language_map.get(language, 'en')
-    
-    try:
-        # Create audio directly in memory for faster processing
-        audio_io = BytesIO()
-        tts = gTTS(
-            text=text,
-            lang=lang_code,
-            slow=False,
-            lang_check=False
-        )
-        tts.write_to_fp(audio_io)
-        audio_io.seek(0)
-        
+    lang_code = tts.language_code(data.get('language', 'en'))
+    return _audio_response(tts.audio_key(text, lang_code), text, lang_code)
+
+def text_to_speech_url():
+    """Registers text for playback and returns a cacheable audio URL for it."""
+    data = request.json
+    text = data.get('text', '')
+    if not text.strip():
+        return {'error': 'No text to read'}, 400
+    key = tts.register_text(text, tts.language_code(data.get('language', 'en')))
+    return {'url': f"/audio/{key}.mp3"}
+
+def audio(key):
+    text, lang_code = tts.registered_text(key)
+    if tts.cached_audio_path(key) is None and text is None:
+        return {'error': 'Audio not found'}, 404
+    return _audio_response(key, text, lang_code)
+
+def _audio_response(key, text, lang_code):
+    """Serves cached audio with ETag/Range support, or streams fresh synthesis."""
+    path = web.cached_audio(key)
+    if path:
         response = send_file(
-            audio_io,
+            path,
             mimetype='audio/mpeg',
-            as_attachment=True,
-            download_name='speech.mp3'
+            download_name='speech.mp3',
+            conditional=True,
+            etag=key,
+            max_age=86400
         )
-        
-        # Add streaming headers
-        response.headers.update({
-            'Cache-Control': 'no-cache',
-            'Accept-Ranges': 'bytes',
-            'Content-Transfer-Encoding': 'binary'
-        })
-        
+        response.headers.update(web.CACHED_AUDIO_HEADERS)
         return response
-            
+
+    if request.if_none_match.contains(key):
+        return Response(status=304, headers={'ETag': f'"{key}"'})
+
+    try:
+        stream = web.audio_stream(text, lang_code, key)
     except Exception as e:
         logger.error(f"TTS Error: {str(e)}")
         return {'error': str(e)}, 500
 
-@app.after_request
+    return Response(stream, mimetype='audio/mpeg', headers={
+        **web.STREAMED_AUDIO_HEADERS,
+        'Content-Disposition': 'attachment; filename=speech.mp3'
+    })
+
+def stats():
+    from modules.analyzer import analysis_cache, chunk_cache, translation_cache, key_pool
+    from modules.pdf_generator import report_cache
+    return jsonify({
+        'api_keys': key_pool.metrics(),
+        'caches': {
+            'analysis': analysis_cache.get_stats(),
+            'analysis_chunks': chunk_cache.get_stats(),
+            'translations': translation_cache.get_stats(),
+            'pdf_reports': report_cache.get_stats(),
+        }
+    })
+
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def start_timing():
+    g.request_start = time.perf_counter()
+    if metrics.TIMING_HEADERS:
+        metrics.start_request_timing()
+
+def add_timing_header(response):
+    metrics.observe('policyguard_request_seconds', time.perf_counter() - g.request_start,
+                    help='Request latency by endpoint', endpoint=request.endpoint or 'unknown')
+    if metrics.TIMING_HEADERS:
+        timing = metrics.finish_request_timing()
+        if timing:
+            response.headers['Server-Timing'] = timing
+    return response
+
 def add_security_headers(response):
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
+    response.headers.update(web.SECURITY_HEADERS)
     return response
 
-@app.errorhandler(404)
 def not_found_error(error):
     return render_template('index.html', error="Page not found"), 404
 
-@app.errorhandler(500)
 def internal_error(error):
     return render_template('index.html', error="An internal error occurred"), 500
 
+ROUTES = [
+    ('/', index, ['GET', 'POST']),
+    ('/result/<analysis_id>', result_permalink, ['GET']),
+    ('/api/translate', translate, ['POST']),
+    ('/analyze', submit_analysis, ['POST']),
+    ('/jobs/<job_id>', job_status, ['GET']),
+    ('/jobs/<job_id>/events', job_events, ['GET']),
+    ('/api/batch', batch_analyze, ['POST']),
+    ('/download_pdf', download_pdf, ['GET']),
+    ('/text-to-speech', text_to_speech, ['POST']),
+    ('/text-to-speech/url', text_to_speech_url, ['POST']),
+    ('/audio/<key>.mp3', audio, ['GET']),
+    ('/stats', stats, ['GET']),
+    ('/metrics', metrics_endpoint, ['GET']),
+]
+
+def create_app():
+    """Builds the Flask app. Cheap: no subsystem is imported until it is used."""
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'a_very_secret_key_for_development'
+
+    # Add session configuration
+    app.config.update(
+        SESSION_COOKIE_SECURE=True,
+        SESSION_COOKIE_HTTPONLY=True,
+        SESSION_COOKIE_SAMESITE='Lax',
+        PERMANENT_SESSION_LIFETIME=1800  # 30 minutes
+    )
+
+    # Languages offered for switching a finished analysis
+    app.jinja_env.globals['languages'] = list(tts.LANGUAGE_CODES)
+
+    for rule, view, methods in ROUTES:
+        app.add_url_rule(rule, view_func=view, methods=methods)
+    app.before_request(start_timing)
+    app.after_request(add_timing_header)
+    app.after_request(add_security_headers)
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, internal_error)
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
-    setup_fonts()
     app.run(debug=True)
@@ -0,0 +1,135 @@
+"""
+ASGI entry point. The routes that spend their time waiting on remote sites,
+Gemini or gTTS are served here as async handlers; every other route is the
+Flask app, mounted unchanged. Run it with serve.py or any ASGI server:
+
+    uvicorn asgi:app
+"""
+import time
+import functools
+import logging
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, StreamingResponse, FileResponse, Response
+from starlette.routing import Route, Mount
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # a2wsgi is optional; Starlette's adapter also works
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+from app import app as flask_app, job_queue
+from modules import aio, tts, metrics, web
+
+logger = logging.getLogger(__name__)
+
+def async_route(endpoint):
+    """Records request latency and adds the headers Flask's after_request hooks add."""
+    def decorate(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            start = time.perf_counter()
+            response = await handler(request)
+            metrics.observe('policyguard_request_seconds', time.perf_counter() - start,
+                            help='Request latency by endpoint', endpoint=endpoint)
+            response.headers.update(web.SECURITY_HEADERS)
+            return response
+        return wrapper
+    return decorate
+
+async def _request_data(request):
+    """Reads a JSON or form body; None when it cannot be parsed."""
+    try:
+        if request.headers.get('content-type', '').startswith('application/json'):
+            data = await request.json()
+            return data if isinstance(data, dict) else None
+        return await request.form()
+    except (ValueError, HTTPException):
+        return None
+
+def _bad_body():
+    return JSONResponse({'error': 'Could not read the request body.'}, status_code=400)
+
+@async_route('submit_analysis')
+async def submit_analysis(request):
+    data = await _request_data(request)
+    if data is None:
+        return _bad_body()
+    url = (data.get('url') or '').strip()
+    language = data.get('language') or 'English'
+    if not url:
+        return JSONResponse({'error': 'A website URL is required.'}, status_code=400)
+
+    job = job_queue.submit(url, language)
+    return JSONResponse({'job_id': job.id, 'status': job.status}, status_code=202)
+
+@async_route('analyze_now')
+async def analyze_now(request):
+    """Runs an analysis and answers with its result, awaiting the whole pipeline."""
+    data = await _request_data(request)
+    if data is None:
+        return _bad_body()
+    url = (data.get('url') or '').strip()
+    if not url:
+        return JSONResponse({'error': 'A website URL is required.'}, status_code=400)
+    try:
+        result = await aio.run_analysis(url, data.get('language') or 'English')
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}", exc_info=True)
+        return JSONResponse({'error': "An error occurred while processing your request. Please try again."},
+                            status_code=500)
+    return JSONResponse(result, status_code=422 if 'error' in result else 200)
+
+@async_route('job_events')
+async def job_events(request):
+    job = job_queue.get(request.path_params['job_id'])
+    if not job:
+        return JSONResponse({'error': 'Job not found'}, status_code=404)
+
+    return StreamingResponse(web.job_event_stream_async(job), media_type='text/event-stream',
+                             headers=web.EVENT_STREAM_HEADERS)
+
+@async_route('text_to_speech')
+async def text_to_speech(request):
+    data = await _request_data(request)
+    if data is None:
+        return _bad_body()
+    text = data.get('text', '')
+    lang_code = tts.language_code(data.get('language', 'en'))
+    return await _audio_response(request, tts.audio_key(text, lang_code), text, lang_code)
+
+@async_route('audio')
+async def audio(request):
+    key = request.path_params['key']
+    text, lang_code = await aio.run_blocking(tts.registered_text, key)
+    if tts.cached_audio_path(key) is None and text is None:
+        return JSONResponse({'error': 'Audio not found'}, status_code=404)
+    return await _audio_response(request, key, text, lang_code)
+
+async def _audio_response(request, key, text, lang_code):
+    """Serves cached audio, or streams fresh synthesis without holding a thread."""
+    path = web.cached_audio(key)
+    etag = f'"{key}"'
+    if etag in request.headers.get('if-none-match', ''):
+        return Response(status_code=304, headers={'ETag': etag})
+    if path:
+        return FileResponse(path, media_type='audio/mpeg', filename='speech.mp3', headers={
+            'ETag': etag, **web.CACHED_AUDIO_HEADERS
+        })
+
+    try:
+        stream = await web.audio_stream_async(text, lang_code, key)
+    except Exception as e:
+        logger.error(f"TTS Error: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+    return StreamingResponse(stream, media_type='audio/mpeg', headers=web.STREAMED_AUDIO_HEADERS)
+
+app = Starlette(routes=[
+    Route('/analyze', submit_analysis, methods=['POST']),
+    Route('/api/analyze', analyze_now, methods=['POST']),
+    Route('/jobs/{job_id}/events', job_events),
+    Route('/text-to-speech', text_to_speech, methods=['POST']),
+    Route('/audio/{key}.mp3', audio),
+    Mount('/', WSGIMiddleware(flask_app)),
+])
@@ -0,0 +1,66 @@
+"""
+Compares the text extraction engines on the fixture pages in corpus/.
+
+    python -m benchmarks.bench_extract [--corpus DIR] [--rounds N] [--repeat N]
+
+For each engine it reports parse time per page, throughput, and how closely
+its output matches the original bs4 extraction. Overlap is measured over the
+non-whitespace characters, since engines may differ in where they put
+spaces; the bs4 engine also repeats the text of nested content areas, which
+the lxml engine emits once, so overlap on such pages is expected to be lower.
+"""
+import os
+import time
+import argparse
+from collections import Counter
+from modules.extractor import ENGINES
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+def load_corpus(corpus_dir, repeat=1):
+    pages = {}
+    for root, _, files in os.walk(corpus_dir):
+        for name in sorted(files):
+            if name.endswith(('.html', '.htm')):
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    html = f.read()
+                if repeat > 1:
+                    # Blow the body up to simulate multi-megabyte pages
+                    head, sep, body = html.partition(b'<body>')
+                    html = head + sep + body * repeat
+                pages[os.path.relpath(path, corpus_dir)] = html
+    return pages
+
+def text_overlap(reference, candidate):
+    ref, cand = Counter(''.join(reference.split())), Counter(''.join(candidate.split()))
+    total = max(sum(ref.values()), sum(cand.values()))
+    return sum((ref & cand).values()) / total if total else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='directory of .html pages')
+    parser.add_argument('--rounds', type=int, default=5, help='timed runs per page and engine')
+    parser.add_argument('--repeat', type=int, default=1, help='repeat each page body N times')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.repeat)
+    if not pages:
+        parser.error(f"No .html pages found in {args.corpus}")
+    total_bytes = sum(len(html) for html in pages.values())
+    print(f"{len(pages)} pages, {total_bytes / 1e6:.2f} MB, {args.rounds} rounds\n")
+
+    reference = {name: ENGINES['bs4'](html) for name, html in pages.items()}
+    print(f"{'engine':<8} {'ms/page':>9} {'MB/s':>8} {'overlap':>8} {'chars':>10}")
+    for engine, extract in ENGINES.items():
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            outputs = {name: extract(html) for name, html in pages.items()}
+        elapsed = (time.perf_counter() - start) / args.rounds
+        overlap = sum(text_overlap(reference[name], outputs[name]) for name in pages) / len(pages)
+        chars = sum(len(text) for text in outputs.values())
+        print(f"{engine:<8} {elapsed * 1000 / len(pages):>9.2f} {total_bytes / 1e6 / elapsed:>8.2f} "
+              f"{overlap:>8.3f} {chars:>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Offline end-to-end benchmark of the analysis pipeline.
+
+    python -m benchmarks.bench_pipeline [--concurrency 1,4,16] [--requests 48]
+                                        [--llm-latency 0.5] [--site-latency 0.05]
+
+Every site in the corpus directory is served by a local HTTP fixture server
+on its own port, and the model is replaced by the deterministic FakeBackend,
+so no live site or API key is touched. Requests go through the Flask app's
+form POST, i.e. validate_url -> find_policy_links -> get_text_from_url ->
+analyze_policy_text -> render. For each concurrency level the harness
+reports p50/p95/p99 latency, requests/sec and per-stage timings.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+import functools
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# Caches would turn every repeat request into a hit; start from a cold,
+# memory-only configuration unless --cache is given
+os.environ.setdefault("POLICYGUARD_CACHE_DIR", "")
+os.environ["POLICYGUARD_LLM_BACKEND"] = "fake"
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves a fixture site, mapping extensionless paths to .html files."""
+
+    latency = 0.0
+
+    def translate_path(self, path):
+        translated = super().translate_path(path)
+        if not os.path.splitext(translated)[1] and os.path.isfile(translated + '.html'):
+            return translated + '.html'
+        return translated
+
+    def end_headers(self):
+        if self.latency:
+            time.sleep(self.latency)
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fixture_servers(corpus_dir, latency):
+    """Starts one server per site directory; returns {site: base_url}."""
+    sites = {}
+    for site in sorted(os.listdir(corpus_dir)):
+        site_dir = os.path.join(corpus_dir, site)
+        if not os.path.isfile(os.path.join(site_dir, 'index.html')):
+            continue
+        handler = type('SiteHandler', (FixtureHandler,), {'latency': latency})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(handler, directory=site_dir))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        sites[site] = f"http://127.0.0.1:{server.server_address[1]}/"
+    return sites
+
+class StageTimer:
+    """Records wall time of wrapped functions per stage, thread-safely."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def wrap(self, owner, name, stage):
+        original = getattr(owner, name)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.samples[stage].append(time.perf_counter() - start)
+
+        setattr(owner, name, timed)
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def run_level(app, sites, concurrency, total_requests, timer):
+    timer.reset()
+    site_urls = list(sites.values())
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one_request(index):
+        nonlocal errors
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/', data={'url': site_urls[index % len(site_urls)], 'language': 'English'})
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code != 200 or b'Analysis Results' not in response.data:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(total_requests)))
+    wall = time.perf_counter() - start
+
+    print(f"\nconcurrency {concurrency}: {total_requests} requests in {wall:.2f}s, "
+          f"{total_requests / wall:.1f} req/s, {errors} errors")
+    print(f"  latency   p50 {percentile(latencies, 50) * 1000:8.1f} ms"
+          f"   p95 {percentile(latencies, 95) * 1000:8.1f} ms"
+          f"   p99 {percentile(latencies, 99) * 1000:8.1f} ms")
+    for stage, samples in timer.samples.items():
+        print(f"  {stage:<20} n={len(samples):<5} mean {sum(samples) / len(samples) * 1000:8.1f} ms"
+              f"   p95 {percentile(samples, 95) * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='directory with one sub-directory per site')
+    parser.add_argument('--concurrency', default='1,4,16', help='comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=48, help='requests per concurrency level')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='seconds per fake model call')
+    parser.add_argument('--site-latency', type=float, default=0.0, help='seconds added to each fixture response')
+    parser.add_argument('--cache', action='store_true', help='keep the analysis caches enabled')
+    args = parser.parse_args()
+
+    from modules import analyzer, changes, pipeline, scraper
+    from modules.llm import FakeBackend, set_backend
+    import app as webapp
+
+    # app.py logs each request and stage at INFO (its LOG_LEVEL default);
+    # only errors are kept so the report stays readable
+    logging.getLogger().setLevel(logging.ERROR)
+    set_backend(FakeBackend(latency=args.llm_latency))
+    if not args.cache:
+        analyzer.analysis_cache.max_memory_items = 0
+        analyzer.chunk_cache.max_memory_items = 0
+        analyzer.translation_cache.max_memory_items = 0
+        changes.snapshot_store.max_memory_items = 0
+        scraper.page_cache.max_memory_items = 0
+        scraper.discovery_cache.max_memory_items = 0
+
+    timer = StageTimer()
+    timer.wrap(pipeline, 'validate_url', 'validate_url')
+    timer.wrap(pipeline, 'find_policy_links', 'find_policy_links')
+    timer.wrap(scraper, 'get_text_from_url', 'get_text_from_url')
+    timer.wrap(scraper, 'extract_text_stream', 'extract_text')
+    timer.wrap(pipeline, 'analyze_policy_text', 'analyze_policy_text')
+    timer.wrap(webapp, 'render_template', 'render')
+
+    sites = start_fixture_servers(args.corpus, args.site_latency)
+    if not sites:
+        parser.error(f"No sites (directories with index.html) found in {args.corpus}")
+    print(f"Serving {len(sites)} fixture sites; fake model latency {args.llm_latency}s")
+
+    for concurrency in (int(level) for level in args.concurrency.split(',')):
+        run_level(webapp.app, sites, concurrency, args.requests, timer)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Measures how long a fresh web process takes to become ready to serve.
+
+    python -m benchmarks.bench_startup [--runs N] [--target app] [--target asgi]
+
+Each run starts a new interpreter, imports the target module and serves one
+request to / through the Flask app. It reports import, first-request and
+whole-process times, and which heavy libraries the import loaded; those
+should only be loaded by the first request that needs them.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that only some requests need
+HEAVY_MODULES = ['google.generativeai', 'gtts', 'fpdf', 'bs4', 'requests', 'pypdf', 'lxml.etree']
+
+CHILD = '''
+import sys, time, json, importlib
+imported_at = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+ready_at = time.perf_counter()
+loaded = [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+flask_app = getattr(module, 'flask_app', None) or module.app
+status = flask_app.test_client().get('/').status_code
+served_at = time.perf_counter()
+print(json.dumps({
+    'import_ms': (ready_at - imported_at) * 1000,
+    'first_request_ms': (served_at - ready_at) * 1000,
+    'status': status,
+    'loaded': loaded,
+}))
+'''
+
+def run_once(target):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, target, json.dumps(HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    run = json.loads(output.strip().splitlines()[-1])
+    run['total_ms'] = (time.perf_counter() - start) * 1000
+    return run
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='fresh processes started per target')
+    parser.add_argument('--target', action='append', help='module to import (default: app and asgi)')
+    args = parser.parse_args()
+
+    print(f"{'target':<8} {'':<14} {'p50 ms':>9} {'p95 ms':>9}")
+    for target in args.target or ['app', 'asgi']:
+        runs = [run_once(target) for _ in range(args.runs)]
+        for field, label in (('import_ms', 'import'), ('first_request_ms', 'first request'),
+                             ('total_ms', 'process total')):
+            values = [run[field] for run in runs]
+            print(f"{target:<8} {label:<14} {percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f}")
+        statuses = sorted({run['status'] for run in runs})
+        loaded = sorted({name for run in runs for name in run['loaded']})
+        print(f"{target:<8} GET / -> {', '.join(map(str, statuses))}; "
+              f"heavy modules loaded at import: {', '.join(loaded) or 'none'}\n")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import threading
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+def load_env():
+    """Loads .env into the environment once per process, before settings are read."""
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
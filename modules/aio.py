@@ -0,0 +1,47 @@
+import os
+import asyncio
+import functools
+import importlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from modules.metrics import current_timings, request_timings
+
+logger = logging.getLogger(__name__)
+
+# The pipeline blocks on remote sites and the model; awaiting it runs the
+# blocking work on this pool, so the event loop keeps serving connections
+# while at most AIO_WORKERS calls are in progress
+AIO_WORKERS = int(os.getenv("AIO_WORKERS", 32))
+
+_executor = ThreadPoolExecutor(max_workers=AIO_WORKERS, thread_name_prefix='aio')
+
+async def run_blocking(fn, *args, **kwargs):
+    """Awaits fn(*args, **kwargs) on the worker pool, keeping request timings."""
+    timings = current_timings()
+
+    def call():
+        with request_timings(timings):
+            return fn(*args, **kwargs)
+
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
+
+def _deferred(module, name):
+    """
+    Returns a callable for module.name that imports module when first called,
+    on the worker pool rather than the event loop.
+    """
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+    return call
+
+def _threadsafe(callback):
+    """Wraps an async-side callback so pipeline threads can call it."""
+    if callback is None:
+        return None
+    loop = asyncio.get_running_loop()
+    return lambda *args: loop.call_soon_threadsafe(functools.partial(callback, *args))
+
+async def run_analysis(url, language, progress=None, on_field=None):
+    """Awaitable run_analysis; progress and on_field are called on the event loop."""
+    return await run_blocking(_deferred('modules.pipeline', 'run_analysis'), url, language,
+                              progress=_threadsafe(progress), on_field=_threadsafe(on_field))
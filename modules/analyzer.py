@@ -1,9 +1,60 @@
 import os
-import google.generativeai as genai
 import json
-from dotenv import load_dotenv
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from modules.cache import TieredCache, make_key, normalize_text
+from modules.keypool import KeyPool
+from modules.llm import get_backend
+from modules.sections import SECTION_BOUNDARY, SENTENCE_BOUNDARY
+from modules import metrics, load_env
 
-load_dotenv()
+load_env()
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt or output schema changes so cached analyses
+# produced by the old prompt are not served.
+PROMPT_VERSION = '5'
+
+analysis_cache = TieredCache(
+    'analysis',
+    ttl=int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 3600)),
+    max_memory_items=int(os.getenv("ANALYSIS_CACHE_MEMORY_ITEMS", 256)),
+    max_disk_items=int(os.getenv("ANALYSIS_CACHE_DISK_ITEMS", 10000)),
+)
+
+# Long policies are analyzed in chunks of at most CHUNK_SIZE characters,
+# split on section boundaries, and the per-chunk results merged.
+CHUNK_SIZE = int(os.getenv("ANALYSIS_CHUNK_SIZE", 12000))
+# Enough chunks for the longest text the scraper reads (MAX_POLICY_CHARS),
+# allowing for content-defined boundaries that end chunks half full; only a
+# policy past that is cut short, and its result says so
+MAX_CHUNKS = int(os.getenv("ANALYSIS_MAX_CHUNKS", 0)) or (
+    2 * -(-int(os.getenv("MAX_POLICY_CHARS", 200000)) // CHUNK_SIZE) + 1
+)
+# Chunk analyses combined per merge call; more are merged in rounds
+MERGE_FAN_IN = int(os.getenv("ANALYSIS_MERGE_FAN_IN", 12))
+MAX_CONCURRENT_CHUNKS = int(os.getenv("ANALYSIS_MAX_CONCURRENT_CHUNKS", 3))
+# On average one piece in this many past a chunk's half-way mark ends it
+CHUNK_BOUNDARY_ODDS = 4
+
+RISK_LEVELS = ['Safe', 'Medium Risk', 'High Risk']
+
+chunk_cache = TieredCache(
+    'analysis_chunks',
+    ttl=int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 3600)),
+    max_memory_items=int(os.getenv("ANALYSIS_CACHE_MEMORY_ITEMS", 256)),
+    max_disk_items=int(os.getenv("ANALYSIS_CACHE_DISK_ITEMS", 10000)),
+)
+
+# Translations of an analysis' summary and risks, per language
+translation_cache = TieredCache(
+    'translations',
+    ttl=int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 3600)),
+    max_memory_items=int(os.getenv("ANALYSIS_CACHE_MEMORY_ITEMS", 256)),
+    max_disk_items=int(os.getenv("ANALYSIS_CACHE_DISK_ITEMS", 10000)),
+)
 
 # Add multiple API keys
 API_KEYS = [
@@ -11,32 +62,340 @@ API_KEYS = [
     os.getenv("GEMINI_API_KEY_2"),
     os.getenv("GEMINI_API_KEY_3"),
 ]
-current_key_index = 0
-
-def get_next_api_key():
-    global current_key_index
-    start_index = current_key_index
-    
-    while True:
-        api_key = API_KEYS[current_key_index]
-        if api_key:  # Check if key is not None or empty
-            return api_key
-            
-        current_key_index = (current_key_index + 1) % len(API_KEYS)
-        if current_key_index == start_index:
-            return None  # All keys are invalid
-
-def analyze_policy_text(text, target_language="English"):
+
+key_pool = KeyPool(
+    API_KEYS,
+    requests_per_minute=int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 15)),
+    tokens_per_minute=int(os.getenv("GEMINI_TOKENS_PER_MINUTE", 1000000)),
+)
+
+def _collect_key_pool_metrics():
+    keys = key_pool.metrics()
+    return [
+        ('policyguard_api_key_requests_total', 'counter', 'Model calls scheduled per API key',
+         [({'key': key['key']}, key['requests']) for key in keys]),
+        ('policyguard_api_key_tokens_total', 'counter', 'Estimated tokens scheduled per API key',
+         [({'key': key['key']}, key['tokens']) for key in keys]),
+        ('policyguard_api_key_throttled_total', 'counter', 'Rate-limit responses per API key',
+         [({'key': key['key']}, key['throttled']) for key in keys]),
+        ('policyguard_api_key_cooling_down', 'gauge', 'Whether an API key is in 429 cooldown',
+         [({'key': key['key']}, int(key['cooling_down'])) for key in keys]),
+    ]
+
+metrics.register_collector(_collect_key_pool_metrics)
+
+# Analyses currently running, by cache key
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+def analyze_policy_text(text, target_language="English", on_field=None):
     """
     Uses the Gemini LLM to summarize, analyze risk, and translate policy text.
+    The language-independent analysis is cached by policy text and
+    prompt/model version, and its translation separately per language, so
+    the same policy in another language costs only a short translation call.
+    If on_field is given the replies are streamed and on_field(name, value)
+    is called for each field as soon as it is complete.
     """
-    # Truncate text if too long to avoid quota issues
-    max_length = 12000
-    if len(text) > max_length:
-        text = text[:max_length] + "..."
+    def on_analysis_field(field, value):
+        if field == 'risk_category':
+            on_field(field, value)
+        elif target_language == 'English' and field in ('summary', 'key_risks'):
+            on_field(f"translated_{field}", value)
+
+    analysis = analyze_policy(text, on_analysis_field if on_field else None)
+    if 'error' in analysis:
+        return analysis
+
+    try:
+        # English fields were already streamed as part of the analysis
+        translations = translate_analysis(
+            analysis, [target_language], on_field if target_language != 'English' else None
+        )
+    except Exception as e:
+        return _error_result(e)
+    return dict(analysis, **translations[target_language])
+
+def analyze_policy(text, on_field=None):
+    """
+    Analyzes policy text in English, returning its risk_category, summary and
+    key_risks. Results are cached by policy text and prompt/model version.
+    """
+    cache_key = make_key(normalize_text(text), PROMPT_VERSION, get_backend().model_id)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Analysis cache hit")
+        if on_field:
+            for field, value in cached.items():
+                on_field(field, value)
+        return cached
+
+    # Identical texts analyzed at the same time (e.g. a vendor ToS shared by
+    # several sites in a batch) wait for the first call instead of repeating it
+    with _in_flight_lock:
+        pending = _in_flight.get(cache_key)
+        if pending is None:
+            _in_flight[cache_key] = Future()
+    if pending is not None:
+        logger.info("Waiting for identical analysis in flight")
+        result = pending.result()
+        if on_field and 'error' not in result:
+            for field, value in result.items():
+                on_field(field, value)
+        return result
+
+    try:
+        result = _analyze_uncached(text, on_field)
+        if 'error' not in result:
+            analysis_cache.set(cache_key, result)
+        _in_flight[cache_key].set_result(result)
+        return result
+    except BaseException as e:
+        _in_flight[cache_key].set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[cache_key]
+
+def translate_analysis(analysis, languages, on_field=None):
+    """
+    Translates the summary and key risks of an English analysis into each of
+    languages, returning {language: {'translated_summary', 'translated_key_risks'}}.
+    Translations are cached per language, and all the missing ones are
+    requested in one call. Raises on failure. If on_field is given and one
+    language is requested, its translated fields are streamed to it.
+    """
+    source = {'summary': analysis.get('summary', ''), 'key_risks': analysis.get('key_risks', [])}
+    source_key = make_key(json.dumps(source, sort_keys=True), PROMPT_VERSION, get_backend().model_id)
+
+    translations = {}
+    missing = []
+    for language in dict.fromkeys(languages):
+        if language == 'English':
+            translations[language] = {
+                'translated_summary': source['summary'],
+                'translated_key_risks': source['key_risks'],
+            }
+            continue
+        cached = translation_cache.get(make_key(source_key, language))
+        if cached is not None:
+            translations[language] = cached
+        else:
+            missing.append(language)
+
+    if on_field:
+        for translation in translations.values():
+            for field, value in translation.items():
+                on_field(field, value)
+
+    if missing:
+        logger.info(f"Translating analysis into {', '.join(missing)}")
+
+        def on_language(language, value):
+            # One language at a time, so its fields are the ones shown
+            if isinstance(value, dict):
+                on_field('translated_summary', value.get('summary', ''))
+                on_field('translated_key_risks', value.get('key_risks', []))
+
+        stream = on_language if on_field and len(missing) == 1 else None
+        reply = _generate_json(_build_translation_prompt(source, missing), stream)
+        for language in missing:
+            entry = reply.get(language)
+            if not isinstance(entry, dict):
+                raise ValueError(f"Translation reply has no {language} entry")
+            translation = {
+                'translated_summary': entry.get('summary', ''),
+                'translated_key_risks': entry.get('key_risks', []),
+            }
+            translation_cache.set(make_key(source_key, language), translation)
+            translations[language] = translation
+    return translations
+
+def split_into_chunks(text, max_chars=CHUNK_SIZE):
+    """Splits policy text on section boundaries into chunks of at most max_chars."""
+    text = normalize_text(text)
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    pieces = []
+    for section in SECTION_BOUNDARY.split(text):
+        section = section.strip()
+        if not section:
+            continue
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        # Oversized section: fall back to sentences, then hard cuts
+        for sentence in SENTENCE_BOUNDARY.split(section):
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                pieces.append(sentence)
+
+    # Once a chunk is half full it may also end after any piece whose hash
+    # marks a boundary. Boundaries chosen by content rather than position
+    # keep an edited or inserted section from shifting every later chunk, so
+    # re-analyzing a changed policy misses the chunk cache only near the edit.
+    chunks = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+        if len(current) >= max_chars // 2 and int(make_key(piece)[:8], 16) % CHUNK_BOUNDARY_ODDS == 0:
+            chunks.append(current)
+            current = ''
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _analyze_uncached(text, on_field=None):
+    chunks = split_into_chunks(text)
+    if not chunks:
+        return {"error": "Analysis failed: no policy text to analyze"}
+    truncated = len(chunks) > MAX_CHUNKS
+    if truncated:
+        logger.warning(f"Policy split into {len(chunks)} chunks, analyzing the first {MAX_CHUNKS}")
+        chunks = chunks[:MAX_CHUNKS]
+
+    if len(chunks) == 1:
+        try:
+            return _generate_json(_build_full_prompt(chunks[0]), on_field)
+        except Exception as e:
+            return _error_result(e)
+
+    logger.info(f"Analyzing policy in {len(chunks)} chunks")
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_CHUNKS, len(chunks))) as executor:
+        chunk_results = list(executor.map(_analyze_chunk, chunks))
+
+    # A merge without a failed chunk could miss its risks entirely, so one
+    # failure fails the analysis; the chunks that succeeded stay cached
+    failed = [result for result in chunk_results if 'error' in result]
+    if failed:
+        logger.warning(f"{len(failed)} of {len(chunk_results)} chunks failed")
+        return failed[0]
+    analyzed = chunk_results
+
+    try:
+        # Merge in rounds so no merge prompt grows with the policy
+        while len(analyzed) > MERGE_FAN_IN:
+            analyzed = [_merge_chunk_results(analyzed[start:start + MERGE_FAN_IN])
+                        for start in range(0, len(analyzed), MERGE_FAN_IN)]
+        merged = _merge_chunk_results(analyzed, on_field)
+    except Exception as e:
+        return _error_result(e)
+    if truncated:
+        merged['truncated'] = True
+    return merged
+
+def _analyze_chunk(chunk):
+    """Analyzes one chunk in English, caching the result per chunk text."""
+    cache_key = make_key(chunk, PROMPT_VERSION, get_backend().model_id, 'chunk')
+    cached = chunk_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        result = _generate_json(_build_chunk_prompt(chunk))
+    except Exception as e:
+        return _error_result(e)
+    chunk_cache.set(cache_key, result)
+    return result
+
+def _merge_chunk_results(chunk_results, on_field=None):
+    """Reduces per-chunk analyses into one summary and risk list."""
+    # One risky section makes the whole policy risky, so take the worst level
+    risk_category = max(
+        (result.get('risk_category') for result in chunk_results),
+        key=_risk_rank
+    )
+    if on_field:
+        on_field('risk_category', risk_category)
+
+    sections = []
+    for index, result in enumerate(chunk_results, 1):
+        risks = '\n'.join(f"  - {risk}" for risk in result.get('key_risks', []))
+        sections.append(
+            f"Section {index} ({result.get('risk_category', 'Unknown')}):\n"
+            f"  Summary: {result.get('summary', '')}\n"
+            f"  Risks:\n{risks}"
+        )
 
     prompt = f"""
     You are an expert legal analyst specializing in online privacy and terms of service.
+    A long policy was analyzed section by section. Combine the section analyses below
+    into one structured JSON analysis of the whole policy that is clear, concise, and
+    easy for a non-expert to understand.
+
+    Section Analyses:
+    ---
+    {chr(10).join(sections)}
+    ---
+
+    Perform the following actions:
+    1.  **Summarize**: Provide a brief, easy-to-understand summary of the whole policy.
+    2.  **Identify Key Risks**: Merge duplicate risks and list the top 3-5 most important ones across all sections. If there are no significant risks, state that.
+
+    Provide the output in the following JSON format ONLY, with the fields in this order:
+    {{
+      "summary": "...",
+      "key_risks": [
+        "...",
+        "..."
+      ]
+    }}
+    """
+    def on_merged_field(field, value):
+        # The level was sent above; one in the merge reply is overwritten below
+        if field != 'risk_category':
+            on_field(field, value)
+
+    merged = _generate_json(prompt, on_merged_field if on_field else None)
+    merged['risk_category'] = risk_category
+    return merged
+
+def _risk_rank(category):
+    try:
+        return RISK_LEVELS.index(category)
+    except ValueError:
+        return -1
+
+def _build_chunk_prompt(chunk):
+    return f"""
+    You are an expert legal analyst specializing in online privacy and terms of service.
+    The following text is one section of a longer policy. Analyze it and provide a
+    structured JSON output.
+
+    Policy Section:
+    ---
+    {chunk}
+    ---
+
+    Perform the following actions:
+    1.  **Summarize**: Provide a brief summary of the key points in this section.
+    2.  **Categorize Risk**: Classify this section into one of three risk levels: 'Safe', 'Medium Risk', or 'High Risk'.
+        - 'Safe': The section is clear, standard, and respects user privacy with no concerning clauses.
+        - 'Medium Risk': The section contains some ambiguous language, collects more data than necessary, or shares data with third parties in a non-transparent way.
+        - 'High Risk': The section contains clauses that are hostile to user privacy, claims broad rights over user content, or has unclear terms about data security and usage.
+    3.  **Identify Key Risks**: List up to 5 potential risks or points of concern in this section, or an empty list if there are none.
+
+    Provide the output in the following JSON format ONLY:
+    {{
+      "summary": "...",
+      "risk_category": "...",
+      "key_risks": [
+        "...",
+        "..."
+      ]
+    }}
+    """
+
+def _build_full_prompt(text):
+    return f"""
+    You are an expert legal analyst specializing in online privacy and terms of service.
     Your task is to analyze the following policy text and provide a structured JSON output.
     The analysis should be clear, concise, and easy for a non-expert to understand.
 
@@ -52,53 +411,124 @@ def analyze_policy_text(text, target_language="English"):
         - 'Medium Risk': The policy contains some ambiguous language, collects more data than necessary, or shares data with third parties in a non-transparent way.
         - 'High Risk': The policy contains clauses that are hostile to user privacy, claims broad rights over user content, or has unclear terms about data security and usage.
     3.  **Identify Key Risks**: List the top 3-5 most important potential risks or points of concern for the user. If there are no significant risks, state that.
-    4.  **Translate**: Translate the summary and key risks into **{target_language}**.
 
-    Provide the output in the following JSON format ONLY:
+    Provide the output in the following JSON format ONLY, with the fields in this order:
     {{
-      "summary": "...",
       "risk_category": "...",
+      "summary": "...",
       "key_risks": [
         "...",
         "..."
-      ],
-      "translated_summary": "...",
-      "translated_key_risks": [
-        "...",
-        "..."
       ]
     }}
     """
 
-    try:
-        # Configure with next available API key
-        api_key = get_next_api_key()
-        if not api_key:
-            return {"error": "No valid API key found"}
-            
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.8,
-                "top_k": 40,
-                "max_output_tokens": 2048,
-            },
-            safety_settings=[
-                {
-                    "category": "HARM_CATEGORY_HARASSMENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                }
-            ]
-        )
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '')
+def _build_translation_prompt(source, languages):
+    example = ',\n'.join(
+        f'      "{language}": {{"summary": "...", "key_risks": ["...", "..."]}}' for language in languages
+    )
+    return f"""
+    You are a professional translator of legal and privacy texts.
+    Translate the following policy summary and list of key risks, keeping the meaning
+    precise and the wording easy for a non-expert to understand.
+
+    Summary:
+    {source['summary']}
+
+    Key Risks:
+    {json.dumps(source['key_risks'], ensure_ascii=False)}
+
+    Target languages: {', '.join(languages)}
+
+    Provide the output in the following JSON format ONLY, with one entry per target language:
+    {{
+{example}
+    }}
+    """
+
+def _generate_json(prompt, on_field=None):
+    """
+    Sends prompt to the model backend and parses the JSON reply; raises on
+    failure. With on_field the reply is streamed and parsed incrementally.
+    """
+    backend = get_backend()
+
+    def generate(api_key):
+        if not on_field:
+            return backend.generate(api_key, prompt).text
+        parser = JsonFieldStream()
+        pieces = []
+        for piece in backend.generate_stream(api_key, prompt):
+            pieces.append(piece)
+            for field, value in parser.feed(piece):
+                on_field(field, value)
+        return ''.join(pieces)
+
+    with metrics.timed('llm_call'):
+        if not backend.requires_api_key:
+            text = generate(None)
+        else:
+            # Rough estimate of ~4 characters per token plus the output allowance
+            estimated_tokens = len(prompt) // 4 + backend.generation_config["max_output_tokens"]
+            text = key_pool.call(generate, estimated_tokens)
+    with metrics.timed('json_parse'):
+        cleaned_response = text.strip().replace('```json', '').replace('```', '')
         return json.loads(cleaned_response)
-    except Exception as e:
-        if "429" in str(e):  # Rate limit error
-            return {"error": "API rate limit reached. Please try again in a few minutes or contact support to upgrade your API quota."}
-        if "All API keys have reached their quota" in str(e):
-            return {"error": "All API keys have reached their quota. Please try again later."}
-        return {"error": f"Analysis failed: {str(e)}"}
+
+class JsonFieldStream:
+    """
+    Incremental parser for a streamed JSON object. feed() returns the
+    (name, value) pairs of top-level fields completed by the new text.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = None
+        self._done = False
+
+    def feed(self, text):
+        self._buffer += text
+        if self._pos is None:
+            start = self._buffer.find('{')
+            if start < 0:
+                return []
+            self._pos = start + 1
+
+        fields = []
+        while not self._done:
+            pos = self._skip(self._pos, ', \t\r\n')
+            if pos >= len(self._buffer):
+                break
+            if self._buffer[pos] == '}':
+                self._done = True
+                break
+            try:
+                name, pos = self._decoder.raw_decode(self._buffer, pos)
+                pos = self._skip(pos, ' \t\r\n')
+                if pos >= len(self._buffer) or self._buffer[pos] != ':':
+                    break
+                value, end = self._decoder.raw_decode(self._buffer, self._skip(pos + 1, ' \t\r\n'))
+            except ValueError:
+                break
+            # A value is only final once something follows it; this keeps
+            # numbers and literals from being cut off at a piece boundary
+            if self._skip(end, ' \t\r\n') >= len(self._buffer):
+                break
+            fields.append((name, value))
+            self._pos = end
+        return fields
+
+    def _skip(self, pos, chars):
+        while pos < len(self._buffer) and self._buffer[pos] in chars:
+            pos += 1
+        return pos
+
+def _error_result(e):
+    if "All API keys have reached their quota" in str(e):
+        return {"error": "All API keys have reached their quota. Please try again later."}
+    if "429" in str(e):  # Rate limit error
+        return {"error": "API rate limit reached. Please try again in a few minutes or contact support to upgrade your API quota."}
+    if "No valid API key found" in str(e):
+        return {"error": "No valid API key found"}
+    return {"error": f"Analysis failed: {str(e)}"}
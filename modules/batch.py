@@ -0,0 +1,221 @@
+"""
+Batch analysis of many websites.
+
+    python -m modules.batch urls.txt --output results.jsonl [--language English]
+                                     [--format jsonl|csv] [--workers 8]
+
+URLs are read one per line (blank lines and '#' comments are ignored; '-'
+reads standard input). Records are written as each site finishes. Running
+the same command again resumes: sites already recorded as done in the
+same language in the output file are skipped and the remaining ones
+appended.
+"""
+import os
+import io
+import csv
+import sys
+import json
+import logging
+import argparse
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.cache import TieredCache, make_key
+from modules.pipeline import run_analysis
+
+logger = logging.getLogger(__name__)
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 8))
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", 1000))
+# Sites on the same host analyzed at once, on top of the scraper's own
+# per-host request limit
+BATCH_PER_HOST = int(os.getenv("BATCH_PER_HOST", 2))
+
+CSV_FIELDS = ['input_url', 'language', 'status', 'url', 'risk_category',
+              'summary', 'key_risks', 'changed', 'changes', 'id', 'error']
+
+# Finished records of each batch, so resubmitting an interrupted batch only
+# runs the sites that are still missing
+batch_store = TieredCache(
+    'batches',
+    ttl=int(os.getenv("BATCH_TTL", 7 * 24 * 3600)),
+    max_memory_items=1024,
+    max_disk_items=int(os.getenv("BATCH_DISK_ITEMS", 100000)),
+)
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+def _host_limit(url):
+    host = urlparse(url if '://' in url else f"https://{url}").netloc.lower()
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(BATCH_PER_HOST)
+        return _host_limits[host]
+
+def clean_urls(urls):
+    """Strips and de-duplicates urls, keeping their order."""
+    seen = set()
+    cleaned = []
+    for url in urls:
+        url = (url or '').strip()
+        if url and not url.startswith('#') and url not in seen:
+            seen.add(url)
+            cleaned.append(url)
+    return cleaned
+
+def batch_id(urls, language):
+    return make_key(language, *sorted(urls))[:24]
+
+def to_record(input_url, language, result):
+    """Flattens a run_analysis result into one batch output record."""
+    if 'error' in result:
+        return {'input_url': input_url, 'language': language, 'status': 'failed',
+                'error': result['error']}
+    analysis = result['analysis']
+    # changed is None the first time a policy is seen
+    changes = result.get('changes') or {}
+    return {
+        'input_url': input_url,
+        'language': language,
+        'status': 'done',
+        'url': result['url'],
+        'risk_category': analysis['risk_category'],
+        'summary': analysis['translated_summary'],
+        'key_risks': analysis['translated_key_risks'],
+        'changed': changes.get('changed'),
+        'changes': [change['description'] for change in changes.get('sections', [])],
+        'id': result['id'],
+    }
+
+def analyze_url(url, language):
+    with _host_limit(url):
+        try:
+            return to_record(url, language, run_analysis(url, language))
+        except Exception as e:
+            logger.error(f"Batch analysis of {url} failed: {str(e)}", exc_info=True)
+            return to_record(url, language, {'error': "An error occurred while processing this site."})
+
+def run_batch(urls, language="English", workers=BATCH_WORKERS, skip=(), resume=True):
+    """
+    Analyzes urls on a bounded worker pool and yields one record per site as
+    it finishes. Unless resume is False, sites already finished in an earlier
+    run of the same batch are yielded first from the batch store; urls in
+    skip are left out.
+    """
+    urls = clean_urls(urls)
+    prefix = batch_id(urls, language)
+    pending = []
+    for url in urls:
+        if url in skip:
+            continue
+        record = batch_store.get(f"{prefix}:{url}") if resume else None
+        if record is not None:
+            yield record
+        else:
+            pending.append(url)
+
+    def work(url):
+        record = analyze_url(url, language)
+        # Stored from the worker so finished sites survive a consumer that
+        # went away mid-batch
+        if record['status'] == 'done':
+            batch_store.set(f"{prefix}:{url}", record)
+        return record
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='batch')
+    try:
+        futures = [executor.submit(work, url) for url in pending]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def format_jsonl(record):
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+def format_csv(record=None):
+    """Formats record as a CSV row, or the header row if record is None."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    if record is None:
+        writer.writeheader()
+    else:
+        writer.writerow(dict(record, key_risks=' | '.join(record.get('key_risks') or []),
+                             changes=' | '.join(record.get('changes') or [])))
+    return buffer.getvalue()
+
+def completed_urls(path, output_format, language):
+    """Returns the input urls recorded as done in language in an existing output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8', newline='') as f:
+        if output_format == 'csv':
+            records = csv.DictReader(f)
+        else:
+            records = []
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by an interrupted run
+                    continue
+        for record in records:
+            if (record.get('status') == 'done' and record.get('input_url') and
+                    record.get('language') == language):
+                done.add(record['input_url'])
+    return done
+
+def _needs_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b'\n'
+
+def read_urls(path):
+    if path == '-':
+        return clean_urls(sys.stdin)
+    with open(path, encoding='utf-8') as f:
+        return clean_urls(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('urls', help="file with one URL per line, or '-' for stdin")
+    parser.add_argument('--output', '-o', required=True, help='JSON Lines or CSV file to write and resume from')
+    parser.add_argument('--language', default='English', help='language of the summaries (default English)')
+    parser.add_argument('--format', choices=('jsonl', 'csv'), help='output format (default from the file extension)')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='sites analyzed in parallel')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+    output_format = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+    urls = read_urls(args.urls)
+    done = completed_urls(args.output, output_format, args.language)
+    remaining = [url for url in urls if url not in done]
+    print(f"{len(urls)} URLs, {len(urls) - len(remaining)} already done, {len(remaining)} to analyze",
+          file=sys.stderr)
+
+    formatter = format_csv if output_format == 'csv' else format_jsonl
+    failed = 0
+    with open(args.output, 'a', encoding='utf-8', newline='') as out:
+        if _needs_newline(args.output):
+            # Finish a line left incomplete by an interrupted run
+            out.write('\n')
+        if output_format == 'csv' and out.tell() == 0:
+            out.write(format_csv())
+
+        records = run_batch(urls, args.language, args.workers, skip=done)
+        for count, record in enumerate(records, 1):
+            out.write(formatter(record))
+            out.flush()
+            failed += record['status'] != 'done'
+            print(f"[{count}/{len(remaining)}] {record['status']:<6} {record['input_url']}", file=sys.stderr)
+
+    print(f"Finished: {len(remaining) - failed} done, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
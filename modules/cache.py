@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from modules import metrics
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the on-disk cache databases; set to an empty string to
+# keep every cache in memory only.
+CACHE_DIR = os.getenv(
+    "POLICYGUARD_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+)
+
+# Every cache created in the process, for the metrics endpoint
+all_caches = []
+
+# Disk-tier access times are written in batches: once this many hits are
+# pending, or when the oldest pending hit is this many seconds old
+ACCESS_FLUSH_ITEMS = 64
+ACCESS_FLUSH_SECONDS = 30
+# Seconds between sweeps of expired disk entries, which also resync the row
+# count with rows written by other processes
+EXPIRY_SWEEP_SECONDS = 300
+
+
+def _collect_cache_metrics():
+    stats = {cache.name: cache.get_stats() for cache in all_caches}
+    return [
+        ('policyguard_cache_hits_total', 'counter', 'Cache hits by cache and tier',
+         [({'cache': name, 'tier': tier}, s[f'{tier}_hits']) for name, s in stats.items()
+          for tier in ('memory', 'disk')]),
+        ('policyguard_cache_misses_total', 'counter', 'Cache misses by cache',
+         [({'cache': name}, s['misses']) for name, s in stats.items()]),
+        ('policyguard_cache_evictions_total', 'counter', 'Cache evictions by cache',
+         [({'cache': name}, s['evictions']) for name, s in stats.items()]),
+        ('policyguard_cache_items', 'gauge', 'Entries held by cache and tier',
+         [({'cache': name, 'tier': tier}, s[f'{tier}_items']) for name, s in stats.items()
+          for tier in ('memory', 'disk')]),
+    ]
+
+
+metrics.register_collector(_collect_cache_metrics)
+
+
+def normalize_text(text):
+    """Collapses whitespace so trivially different scrapes hash the same."""
+    return ' '.join((text or '').split())
+
+
+def make_key(*parts):
+    """Builds a stable content-addressed key from the given parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+class TieredCache:
+    """In-process LRU tier in front of an SQLite tier, both with TTL."""
+
+    def __init__(self, name, ttl=86400, max_memory_items=256,
+                 max_disk_items=10000, cache_dir=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_items = 0
+        self._pending_access = {}
+        self._access_flushed_at = time.time()
+        self._swept_at = 0.0
+        all_caches.append(self)
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+        }
+
+        cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self._db = sqlite3.connect(
+                    os.path.join(cache_dir, f"{name}.sqlite3"),
+                    check_same_thread=False
+                )
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+                )
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at)"
+                )
+                self._db.commit()
+                self._disk_items = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            except sqlite3.Error as e:
+                logger.error(f"Disk cache '{name}' unavailable, using memory only: {e}")
+                self._db = None
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and row[1] > now:
+                        self._record_access(key, now)
+                        value = json.loads(row[0])
+                        self._remember(key, value, row[1])
+                        self.stats['disk_hits'] += 1
+                        return value
+                    if row:
+                        self._disk_items -= self._db.execute(
+                            "DELETE FROM entries WHERE key = ?", (key,)
+                        ).rowcount
+                        self._db.commit()
+                except (sqlite3.Error, ValueError) as e:
+                    logger.error(f"Disk cache '{self.name}' read error: {e}")
+
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Stores value under key in both tiers."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self.stats['sets'] += 1
+
+            if self._db is not None:
+                try:
+                    data = json.dumps(value)
+                    # Both statements use the primary key, so the row count
+                    # is kept without counting the table
+                    updated = self._db.execute(
+                        "UPDATE entries SET value = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                        (data, expires_at, now, key)
+                    ).rowcount
+                    if not updated:
+                        self._db.execute(
+                            "INSERT INTO entries (key, value, expires_at, accessed_at)"
+                            " VALUES (?, ?, ?, ?)",
+                            (key, data, expires_at, now)
+                        )
+                        self._disk_items += 1
+                    self._pending_access.pop(key, None)
+                    self._evict_disk(now)
+                    self._db.commit()
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    logger.error(f"Disk cache '{self.name}' write error: {e}")
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                try:
+                    self._pending_access.pop(key, None)
+                    self._disk_items -= self._db.execute(
+                        "DELETE FROM entries WHERE key = ?", (key,)
+                    ).rowcount
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Disk cache '{self.name}' delete error: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                try:
+                    self._pending_access.clear()
+                    self._db.execute("DELETE FROM entries")
+                    self._db.commit()
+                    self._disk_items = 0
+                except sqlite3.Error as e:
+                    logger.error(f"Disk cache '{self.name}' clear error: {e}")
+
+    def get_stats(self):
+        """Returns a snapshot of the hit/miss counters and tier sizes."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_items'] = len(self._memory)
+            stats['disk_items'] = self._disk_items
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = (
+            (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _record_access(self, key, now):
+        """Queues a disk hit's access time, writing the queue out in one batch."""
+        self._pending_access[key] = now
+        if (len(self._pending_access) >= ACCESS_FLUSH_ITEMS or
+                now - self._access_flushed_at >= ACCESS_FLUSH_SECONDS):
+            self._flush_access(now)
+            self._db.commit()
+
+    def _flush_access(self, now):
+        if self._pending_access:
+            self._db.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+        self._access_flushed_at = now
+
+    def _evict_disk(self, now):
+        if now - self._swept_at >= EXPIRY_SWEEP_SECONDS:
+            self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            self._disk_items = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            self._swept_at = now
+        overflow = self._disk_items - self.max_disk_items
+        if overflow > 0:
+            # Least recently used goes first, so pending hits count
+            self._flush_access(now)
+            evicted = self._db.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            ).rowcount
+            self._disk_items -= evicted
+            self.stats['evictions'] += evicted
@@ -0,0 +1,133 @@
+import os
+import re
+import difflib
+import logging
+from modules.cache import TieredCache, make_key, normalize_text
+from modules.analyzer import PROMPT_VERSION
+from modules.sections import SECTION_BOUNDARY
+from modules.llm import get_backend
+
+logger = logging.getLogger(__name__)
+
+# Characters of a section's opening kept as its title in change reports
+TITLE_CHARS = 80
+# Bump when section hashing changes; older snapshots then report that the
+# policy changed without a section-by-section list
+SECTIONS_VERSION = '2'
+# Similarity above which a risk in the new analysis is taken to be a
+# rewording of one in the previous analysis
+RISK_MATCH_RATIO = 0.5
+
+# The policy's own numbering at the start of a section, e.g. "4.", "4.2",
+# "Section 7" or "ARTICLE IV"; left out of section hashes so renumbered
+# sections compare equal
+SECTION_NUMBER = re.compile(r'^(?:\d{1,2}(?:\.\d{1,2})*\.?|(?:Section|SECTION|Article|ARTICLE)\s+[0-9IVXLC]+\b\.?)\s*')
+# Words in any script, so Cyrillic or Devanagari risks are compared too
+WORD = re.compile(r'\w+')
+
+# Last analyzed version of each policy page and language, kept long enough
+# for scheduled monitoring to compare against
+snapshot_store = TieredCache(
+    'policy_snapshots',
+    ttl=int(os.getenv("SNAPSHOT_TTL", 180 * 24 * 3600)),
+    max_memory_items=int(os.getenv("SNAPSHOT_MEMORY_ITEMS", 128)),
+    max_disk_items=int(os.getenv("SNAPSHOT_DISK_ITEMS", 100000)),
+)
+
+def fingerprint(text):
+    """
+    Identifies a policy text and the prompt and model that analyzed it, so a
+    new prompt version or model re-analyzes even an unchanged policy.
+    """
+    return make_key(normalize_text(text), PROMPT_VERSION, get_backend().model_id)
+
+def split_sections(text):
+    """
+    Returns [title, hash] for each section of text, split on its headings.
+    The title is the section's opening as written; the hash leaves out its
+    number.
+    """
+    sections = []
+    for section in SECTION_BOUNDARY.split(normalize_text(text)):
+        section = section.strip()
+        if section:
+            title = section[:TITLE_CHARS] + ('...' if len(section) > TITLE_CHARS else '')
+            sections.append([title, make_key(SECTION_NUMBER.sub('', section))[:16]])
+    return sections
+
+def _snapshot_key(policy_url, language):
+    return make_key(policy_url, language)
+
+def load_snapshot(policy_url, language):
+    """Returns the last snapshot of policy_url analyzed in language, or None."""
+    return snapshot_store.get(_snapshot_key(policy_url, language))
+
+def save_snapshot(policy_url, language, text, analysis):
+    snapshot_store.set(_snapshot_key(policy_url, language), {
+        'fingerprint': fingerprint(text),
+        'sections_version': SECTIONS_VERSION,
+        'sections': split_sections(text),
+        'analysis': analysis,
+    })
+
+def diff_sections(old_sections, new_sections):
+    """
+    Aligns two section lists by content hash and describes the sections that
+    were added, removed or changed by their headings in the text.
+    """
+    matcher = difflib.SequenceMatcher(
+        a=[digest for _, digest in old_sections],
+        b=[digest for _, digest in new_sections],
+        autojunk=False
+    )
+    changes = []
+    for op, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        paired = min(old_end - old_start, new_end - new_start) if op == 'replace' else 0
+        for offset in range(paired):
+            title = new_sections[new_start + offset][0]
+            changes.append({'change': 'modified', 'title': title, 'description': f"Section changed: {title}"})
+        for index in range(new_start + paired, new_end):
+            title = new_sections[index][0]
+            changes.append({'change': 'added', 'title': title, 'description': f"New clause added: {title}"})
+        for index in range(old_start + paired, old_end):
+            title = old_sections[index][0]
+            changes.append({'change': 'removed', 'title': title, 'description': f"Section removed: {title}"})
+    return changes
+
+def _risk_similarity(a, b):
+    """Similarity of two risk statements, by shared words and by characters."""
+    words_a, words_b = set(WORD.findall(a.lower())), set(WORD.findall(b.lower()))
+    shared = len(words_a & words_b) / len(words_a | words_b) if words_a | words_b else 0.0
+    return max(shared, difflib.SequenceMatcher(None, a.lower(), b.lower()).ratio())
+
+def match_risks(old_risks, new_risks):
+    """
+    Returns (added, removed): risks of each analysis with no close match in
+    the other, so a risk the model merely reworded is not reported.
+    """
+    def unmatched(risks, others):
+        return [risk for risk in risks
+                if not any(_risk_similarity(risk, other) >= RISK_MATCH_RATIO for other in others)]
+    return unmatched(new_risks, old_risks), unmatched(old_risks, new_risks)
+
+def describe_changes(previous, text, analysis):
+    """Compares a new version of a policy and its analysis with the previous snapshot."""
+    sections = []
+    if previous.get('sections_version') == SECTIONS_VERSION:
+        sections = diff_sections(previous['sections'], split_sections(text))
+        if not sections:
+            # Only numbering or spacing changed: the clauses are the same, so
+            # differences between the two analyses are just rewording
+            return {'changed': False}
+    # Snapshots are per language, so the translated risks compare like for like
+    risks_added, risks_removed = match_risks(previous['analysis'].get('translated_key_risks', []),
+                                             analysis.get('translated_key_risks', []))
+    return {
+        'changed': True,
+        'sections': sections,
+        'previous_risk_category': previous['analysis'].get('risk_category', ''),
+        'risks_added': risks_added,
+        'risks_removed': risks_removed,
+    }
@@ -0,0 +1,215 @@
+import os
+import re
+import codecs
+import logging
+from io import BytesIO
+from itertools import chain
+from bs4 import BeautifulSoup
+from bs4.dammit import EncodingDetector
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the bs4 engine works without it
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+# Subtrees that never contain policy text
+SKIP_TAGS = {'script', 'style', 'nav', 'header', 'footer', 'iframe', 'noscript'}
+CONTENT_TAGS = {'main', 'article', 'div', 'section'}
+CONTENT_CLASS = re.compile(r'content|policy|terms|legal|agreement')
+MAIN_TAGS = {'main', 'article'}
+# Elements whose boundaries separate words even without whitespace in the HTML
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'ol',
+    'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+}
+
+def extract_text(html, engine=None, encoding=None):
+    """
+    Extracts readable policy text from html using the configured engine.
+    encoding is the charset the server declared, if any.
+    """
+    engine = engine or default_engine()
+    return ENGINES[engine](html, encoding)
+
+def extract_text_stream(blocks, engine=None, max_chars=None, encoding=None):
+    """
+    Extracts policy text from an iterable of html byte blocks as they
+    arrive. The lxml engine parses incrementally and stops reading once
+    max_chars of policy-content text are collected; the bs4 engine needs
+    the whole document and joins the blocks first. encoding is the charset
+    the server declared; without one it is sniffed from the first block.
+    """
+    engine = engine or default_engine()
+    if engine != 'lxml':
+        return ENGINES[engine](b''.join(blocks), encoding)
+
+    blocks = iter(blocks)
+    first = next(blocks, b'')
+    collector = TextCollector()
+    parser = make_lxml_parser(collector, encoding or sniff_encoding(first))
+    for block in chain([first], blocks):
+        parser.feed(block)
+        if max_chars and collector.content_chars >= max_chars:
+            logger.info(f"Collected {collector.content_chars} characters of policy text, stopping early")
+            break
+    return parser.close()
+
+def sniff_encoding(data):
+    """
+    Charset of an html document from its first bytes: a byte order mark or
+    meta charset, else UTF-8 if they decode as UTF-8, else windows-1252.
+    libxml2 would otherwise read an undeclared page as latin-1.
+    """
+    data, encoding = EncodingDetector.strip_byte_order_mark(data)
+    encoding = encoding or EncodingDetector.find_declared_encoding(data, is_html=True)
+    if encoding:
+        return encoding
+    try:
+        # Not final: the block may end partway through a character
+        codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'windows-1252'
+
+def extract_pdf_text(data, max_chars=None):
+    """Extracts the text of a PDF document page by page, or None without pypdf."""
+    # Imported on the first PDF policy rather than at startup
+    try:
+        from pypdf import PdfReader
+    except ImportError:  # pypdf is optional; PDF policies are skipped without it
+        logger.warning("pypdf is not installed, cannot extract PDF text")
+        return None
+    parts = []
+    length = 0
+    for page in PdfReader(BytesIO(data)).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if max_chars and length >= max_chars:
+            break
+    return ' '.join(' '.join(parts).split())
+
+def default_engine():
+    engine = os.getenv("POLICYGUARD_EXTRACTOR", "lxml" if etree is not None else "bs4")
+    if engine not in ENGINES:
+        logger.warning(f"Unknown extractor '{engine}', using bs4")
+        return 'bs4'
+    return engine
+
+def extract_text_bs4(html, encoding=None):
+    """Reference engine: BeautifulSoup with html.parser, as originally used."""
+    soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding if isinstance(html, bytes) else None)
+
+    # Remove unwanted elements
+    for element in soup(list(SKIP_TAGS)):
+        element.decompose()
+
+    # First try to find specific policy content
+    content_areas = soup.find_all(list(CONTENT_TAGS),
+        class_=lambda x: x and CONTENT_CLASS.search(str(x).lower()))
+
+    if content_areas:
+        text = ' '.join(area.get_text() for area in content_areas)
+    else:
+        # Try to find main content area
+        main_content = soup.find(list(MAIN_TAGS))
+        text = main_content.get_text() if main_content else soup.get_text()
+
+    return ' '.join(text.split())
+
+class TextCollector:
+    """
+    lxml parser target that builds the cleaned text in a single pass over the
+    parse events, without building a tree. Skipped subtrees are pruned as
+    they are parsed, and text is routed to the policy-content, main-content
+    and whole-page buffers at once, so the choice between them is made at
+    the end with no second pass.
+    """
+
+    def __init__(self):
+        self.skip_depth = 0
+        self.content_depth = 0
+        self.main_depth = 0
+        self.main_done = False
+        self.content_chars = 0
+        self.stack = []
+        self.content = []
+        self.main = []
+        self.page = []
+
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else ''
+        roles = 0
+        if self.skip_depth or tag in SKIP_TAGS:
+            self.skip_depth += 1
+            roles |= 1
+        else:
+            if tag in CONTENT_TAGS and CONTENT_CLASS.search(attrib.get('class', '').lower()):
+                self.content_depth += 1
+                roles |= 2
+            if tag in MAIN_TAGS and not self.main_done:
+                self.main_depth += 1
+                roles |= 4
+            if tag in BLOCK_TAGS:
+                self.data(' ')
+        self.stack.append(roles)
+
+    def end(self, tag):
+        if not self.stack:
+            return
+        roles = self.stack.pop()
+        if roles & 1:
+            self.skip_depth -= 1
+            return
+        if tag.lower() in BLOCK_TAGS:
+            self.data(' ')
+        if roles & 2:
+            self.content_depth -= 1
+            if not self.content_depth:
+                self.content.append(' ')
+        if roles & 4:
+            self.main_depth -= 1
+            # Like soup.find, only the first main/article element counts
+            self.main_done = not self.main_depth
+
+    def data(self, data):
+        if self.skip_depth:
+            return
+        self.page.append(data)
+        if self.content_depth:
+            self.content.append(data)
+            self.content_chars += len(data)
+        if self.main_depth:
+            self.main.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        for parts in (self.content, self.main, self.page):
+            text = ' '.join(''.join(parts).split())
+            if text:
+                return text
+        return ''
+
+def make_lxml_parser(collector=None, encoding=None):
+    """
+    Returns an incremental lxml parser decoding encoding and feeding
+    collector, or a fresh TextCollector.
+    """
+    return etree.HTMLParser(target=collector or TextCollector(), encoding=encoding,
+                            remove_comments=True, remove_pis=True)
+
+def extract_text_lxml(html, encoding=None):
+    """Single-pass engine: libxml2's HTML tokenizer driving a TextCollector."""
+    encoding = (encoding or sniff_encoding(html)) if isinstance(html, bytes) else None
+    parser = make_lxml_parser(encoding=encoding)
+    parser.feed(html)
+    return parser.close()
+
+ENGINES = {'bs4': extract_text_bs4}
+if etree is not None:
+    ENGINES['lxml'] = extract_text_lxml
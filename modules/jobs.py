@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs are kept this long so the page can still fetch the result
+JOB_TTL = int(os.getenv("JOB_TTL", 1800))
+
+class Job:
+    """One background analysis and the events it has emitted so far."""
+
+    def __init__(self, key, url, language):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.url = url
+        self.language = language
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []
+        self._changed = threading.Condition()
+        # (loop, asyncio.Event) of async waiters, woken from worker threads
+        self._async_waiters = []
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def emit(self, event, data):
+        with self._changed:
+            self.events.append((event, data))
+            self._changed.notify_all()
+            for loop, waiter in self._async_waiters:
+                loop.call_soon_threadsafe(waiter.set)
+
+    def finish(self, result=None, error=None):
+        """
+        Marks the job done, or failed with error, and emits its final status
+        in the same step, so a waiter that sees the job finished also sees
+        that event.
+        """
+        with self._changed:
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.status = 'failed' if error is not None else 'done'
+            self.emit('status', self.to_dict())
+
+    def wait_for_events(self, after, timeout=15):
+        """Blocks until there are events past index after, or timeout."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: len(self.events) > after or self.finished, timeout=timeout
+            )
+            return self.events[after:]
+
+    async def wait_for_events_async(self, after, timeout=15):
+        """Like wait_for_events, but awaits without holding a thread."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._changed:
+            if len(self.events) > after or self.finished:
+                return self.events[after:]
+            self._async_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._changed:
+                self._async_waiters.remove(waiter)
+        with self._changed:
+            return self.events[after:]
+
+    def to_dict(self):
+        data = {'job_id': self.id, 'status': self.status}
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+class JobQueue:
+    """
+    Runs analyses on a local worker pool. Submitting a URL and language that
+    already have a job in flight returns that job instead of starting another.
+    """
+
+    def __init__(self, runner, max_workers=4):
+        self.runner = runner
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, url, language):
+        key = (url.strip().lower().rstrip('/'), language)
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(key)
+            if job is not None:
+                logger.info(f"Coalescing request for {url} ({language}) into job {job.id}")
+                return job
+
+            job = Job(key, url, language)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = 'running'
+        job.emit('status', {'status': 'running'})
+        result, error = None, None
+        try:
+            result = self.runner(
+                job.url, job.language,
+                progress=lambda stage: job.emit('progress', {'stage': stage}),
+                on_field=lambda field, value: job.emit('field', {'field': field, 'value': value})
+            )
+            if 'error' in result:
+                result, error = None, result['error']
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}", exc_info=True)
+            error = "An error occurred while processing your request. Please try again."
+        finally:
+            with self._lock:
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+            job.finish(result, error)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,172 @@
+import time
+import random
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Classic token bucket: capacity tokens, refilled at rate tokens per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens
+
+    def wait_time(self, amount, now):
+        """Seconds until amount tokens are available (0 if they already are)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount, now):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+class KeyState:
+    """Budgets, cooldown and usage counters for one API key."""
+
+    def __init__(self, index, api_key, requests_per_minute, tokens_per_minute):
+        self.index = index
+        self.api_key = api_key
+        self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self.cooldown_until = 0.0
+        self.consecutive_throttles = 0
+        self.stats = {
+            'requests': 0,
+            'tokens': 0,
+            'throttled': 0,
+            'errors': 0,
+        }
+
+    def wait_time(self, estimated_tokens, now):
+        return max(
+            self.cooldown_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(estimated_tokens, now),
+        )
+
+class RateLimitError(Exception):
+    """Raised when every key in the pool is out of budget or throttled."""
+
+class KeyPool:
+    """
+    Thread-safe scheduler that spreads model calls over several API keys.
+    Each key has request and token budgets (token buckets); a key that gets
+    a 429 is put in cooldown and the call is retried on another key.
+    """
+
+    def __init__(self, api_keys, requests_per_minute=15, tokens_per_minute=1000000,
+                 max_attempts=4, max_wait=30, base_backoff=1.0, max_cooldown=60):
+        self.keys = [
+            KeyState(index, api_key, requests_per_minute, tokens_per_minute)
+            for index, api_key in enumerate(api_keys) if api_key
+        ]
+        self.max_attempts = max_attempts
+        self.max_wait = max_wait
+        self.base_backoff = base_backoff
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def acquire(self, estimated_tokens=0, exclude=()):
+        """
+        Reserves budget on the least-loaded key and returns its KeyState,
+        waiting up to max_wait seconds for one to free up. Keys in exclude are
+        only used when no other key exists.
+        """
+        if not self.keys:
+            raise RuntimeError("No valid API key found")
+
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                candidates = [key for key in self.keys if key.index not in exclude] or self.keys
+                ready = [key for key in candidates if key.wait_time(estimated_tokens, now) <= 0]
+                if ready:
+                    key = max(ready, key=lambda k: (k.requests.available(now), k.tokens.available(now)))
+                    key.requests.consume(1, now)
+                    key.tokens.consume(estimated_tokens, now)
+                    key.stats['requests'] += 1
+                    key.stats['tokens'] += estimated_tokens
+                    return key
+                wait = min(key.wait_time(estimated_tokens, now) for key in candidates)
+
+            if now + wait > deadline:
+                raise RateLimitError("All API keys have reached their quota")
+            time.sleep(min(wait, 1.0))
+
+    def report_success(self, key):
+        with self._lock:
+            key.consecutive_throttles = 0
+
+    def report_throttled(self, key):
+        """Puts key in an exponentially growing cooldown after a 429."""
+        with self._lock:
+            key.consecutive_throttles += 1
+            key.stats['throttled'] += 1
+            cooldown = min(self.max_cooldown, self.base_backoff * 2 ** key.consecutive_throttles)
+            key.cooldown_until = time.monotonic() + cooldown
+            logger.warning(f"API key #{key.index + 1} throttled, cooling down for {cooldown:.0f}s")
+
+    def report_error(self, key):
+        with self._lock:
+            key.stats['errors'] += 1
+
+    def call(self, fn, estimated_tokens=0):
+        """
+        Calls fn(api_key) on a scheduled key, retrying rate-limited calls on
+        other keys with backoff. Other exceptions propagate unchanged.
+        """
+        tried = set()
+        for attempt in range(self.max_attempts):
+            key = self.acquire(estimated_tokens, exclude=tried)
+            try:
+                result = fn(key.api_key)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    self.report_error(key)
+                    raise
+                self.report_throttled(key)
+                tried.add(key.index)
+                if len(tried) >= len(self.keys):
+                    tried.clear()
+                # Jittered backoff so retries from many threads don't align
+                time.sleep(self.base_backoff * (2 ** attempt) * random.uniform(0.5, 1.0))
+                continue
+            self.report_success(key)
+            return result
+        raise RateLimitError("All API keys have reached their quota")
+
+    def metrics(self):
+        """Returns per-key usage and throttle counters; keys are not exposed."""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                dict(
+                    key.stats,
+                    key=f"key_{key.index + 1}",
+                    cooling_down=key.cooldown_until > now,
+                    available_requests=round(key.requests.available(now), 2),
+                    available_tokens=int(key.tokens.available(now)),
+                )
+                for key in self.keys
+            ]
+
+def is_rate_limit_error(e):
+    return "429" in str(e) or type(e).__name__ in ('ResourceExhausted', 'TooManyRequests')
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = 'gemini-1.5-flash'
+
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+DEFAULT_SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    }
+]
+
+class ModelBackend:
+    """Interface for the text generation backends used by the analyzer."""
+
+    # Identifies the model and its generation config in cache keys, so
+    # switching either never serves output produced under the old one
+    model_id = None
+    generation_config = DEFAULT_GENERATION_CONFIG
+    requires_api_key = True
+
+    def generate(self, api_key, prompt):
+        """Returns a response object with a .text attribute."""
+        raise NotImplementedError
+
+    def generate_stream(self, api_key, prompt):
+        """Yields the response text in pieces as the model produces it."""
+        yield self.generate(api_key, prompt).text
+
+class GeminiBackend(ModelBackend):
+    """
+    Gemini models with one long-lived GenerativeServiceClient per API key,
+    built on first use and shared across requests and threads. Clients are
+    created through the public generativelanguage API with the key in their
+    client options, so no process-wide SDK configuration is involved.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, generation_config=None, safety_settings=None):
+        self.model_name = model_name
+        self.generation_config = generation_config or DEFAULT_GENERATION_CONFIG
+        # The generation config shapes the output too (a low token limit cuts
+        # analyses short), so a change to it must not serve cached results
+        config_hash = hashlib.sha256(json.dumps(self.generation_config, sort_keys=True).encode()).hexdigest()
+        self.model_id = f"{model_name}:{config_hash[:12]}"
+        self.safety_settings = safety_settings or DEFAULT_SAFETY_SETTINGS
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get_client(self, api_key):
+        client = self._clients.get(api_key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(api_key)
+                if client is None:
+                    client = self._build_client(api_key)
+                    self._clients[api_key] = client
+        return client
+
+    def _build_client(self, api_key):
+        from google.ai import generativelanguage as glm
+        from google.api_core.client_options import ClientOptions
+
+        client = glm.GenerativeServiceClient(client_options=ClientOptions(api_key=api_key))
+        logger.info(f"Created {self.model_name} client for a new API key")
+        return client
+
+    def _request(self, prompt):
+        from google.ai import generativelanguage as glm
+
+        return glm.GenerateContentRequest(
+            model=f"models/{self.model_name}",
+            contents=[glm.Content(role='user', parts=[glm.Part(text=prompt)])],
+            generation_config=glm.GenerationConfig(**self.generation_config),
+            safety_settings=[glm.SafetySetting(**setting) for setting in self.safety_settings],
+        )
+
+    def generate(self, api_key, prompt):
+        response = self.get_client(api_key).generate_content(request=self._request(prompt))
+        return TextResponse(_response_text(response))
+
+    def generate_stream(self, api_key, prompt):
+        for chunk in self.get_client(api_key).stream_generate_content(request=self._request(prompt)):
+            yield _response_text(chunk)
+
+def _response_text(response):
+    """Text of a GenerateContentResponse's first candidate; raises if the prompt was blocked."""
+    if not response.candidates:
+        if response.prompt_feedback.block_reason:
+            raise ValueError(f"Gemini blocked the prompt: {response.prompt_feedback}")
+        return ''
+    return ''.join(part.text for part in response.candidates[0].content.parts)
+
+class TextResponse:
+    def __init__(self, text):
+        self.text = text
+
+# Line of a translation prompt naming the languages to translate into
+TARGET_LANGUAGES = re.compile(r'^\s*Target languages: (.+)$', re.MULTILINE)
+
+class FakeBackend(ModelBackend):
+    """
+    Deterministic offline stand-in for load testing: waits latency seconds and
+    returns a canned analysis derived from a hash of the prompt.
+    """
+
+    model_id = 'fake'
+    requires_api_key = False
+
+    def __init__(self, latency=0.0, stream_pieces=8):
+        self.latency = latency
+        self.stream_pieces = stream_pieces
+
+    def generate(self, api_key, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt)
+
+    def generate_stream(self, api_key, prompt):
+        # Spread the latency over the pieces like a real streaming reply
+        text = self._respond(prompt).text
+        size = max(1, len(text) // self.stream_pieces + 1)
+        for start in range(0, len(text), size):
+            if self.latency:
+                time.sleep(self.latency / self.stream_pieces)
+            yield text[start:start + size]
+
+    def _respond(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        risk = ['Safe', 'Medium Risk', 'High Risk'][int(digest[:8], 16) % 3]
+        summary = f"Offline analysis {digest[:12]} of {len(prompt)} prompt characters."
+        risks = [f"Placeholder risk {digest[i:i + 6]}" for i in (12, 18, 24)]
+        languages = TARGET_LANGUAGES.search(prompt)
+        if languages:
+            # Translation prompts get one entry per requested language
+            return TextResponse(json.dumps({
+                language.strip(): {
+                    "summary": f"[{language.strip()}] {summary}",
+                    "key_risks": [f"[{language.strip()}] {risk}" for risk in risks],
+                }
+                for language in languages.group(1).split(',')
+            }, ensure_ascii=False))
+        return TextResponse(json.dumps({
+            "risk_category": risk,
+            "summary": summary,
+            "key_risks": risks,
+        }))
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def _env_generation_config():
+    return {
+        "temperature": float(os.getenv("GEMINI_TEMPERATURE", DEFAULT_GENERATION_CONFIG["temperature"])),
+        "top_p": float(os.getenv("GEMINI_TOP_P", DEFAULT_GENERATION_CONFIG["top_p"])),
+        "top_k": int(os.getenv("GEMINI_TOP_K", DEFAULT_GENERATION_CONFIG["top_k"])),
+        "max_output_tokens": int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", DEFAULT_GENERATION_CONFIG["max_output_tokens"])),
+    }
+
+def get_backend():
+    """Returns the process-wide backend chosen by POLICYGUARD_LLM_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.getenv("POLICYGUARD_LLM_BACKEND", "gemini").lower()
+                if name == 'fake':
+                    _backend = FakeBackend(latency=float(os.getenv("FAKE_LLM_LATENCY", 0)))
+                else:
+                    _backend = GeminiBackend(
+                        model_name=os.getenv("GEMINI_MODEL", DEFAULT_MODEL_NAME),
+                        generation_config=_env_generation_config()
+                    )
+    return _backend
+
+def set_backend(backend):
+    """Replaces the process-wide backend, e.g. with a FakeBackend in benchmarks."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
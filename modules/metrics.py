@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans from sub-millisecond parsing up to minute-long model calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+TIMING_HEADERS = os.getenv("POLICYGUARD_TIMING_HEADERS", "").lower() in ('1', 'true', 'yes')
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {}
+_collectors = []
+_request = threading.local()
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def inc(name, amount=1, help='', **labels):
+    """Adds amount to the counter name with the given labels."""
+    with _lock:
+        _help.setdefault(name, help)
+        key = (name, _label_key(labels))
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, value, help='', buckets=DEFAULT_BUCKETS, **labels):
+    """Records value in the histogram name with the given labels."""
+    with _lock:
+        _help.setdefault(name, help)
+        key = (name, _label_key(labels))
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {
+                'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0
+            }
+        for index, bound in enumerate(histogram['buckets']):
+            if value <= bound:
+                histogram['counts'][index] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+@contextmanager
+def timed(stage):
+    """Times the enclosed block as one span of the given pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('policyguard_stage_seconds', elapsed,
+                help='Time spent in each pipeline stage', stage=stage)
+        timings = getattr(_request, 'timings', None)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+def start_request_timing():
+    _request.timings = {}
+
+def current_timings():
+    """Returns the current thread's request timings, to hand to worker threads."""
+    return getattr(_request, 'timings', None)
+
+@contextmanager
+def request_timings(timings):
+    """Attributes spans timed in a worker thread to the given request timings."""
+    previous = getattr(_request, 'timings', None)
+    _request.timings = timings
+    try:
+        yield
+    finally:
+        _request.timings = previous
+
+def finish_request_timing():
+    """Returns the stage timings of the current request as a Server-Timing value."""
+    timings = getattr(_request, 'timings', None)
+    _request.timings = None
+    if not timings:
+        return None
+    return ', '.join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+def register_collector(collector):
+    """
+    Registers a callable returning (name, type, help, samples) tuples, where
+    samples is a list of (labels dict, value); it is called on every scrape.
+    """
+    _collectors.append(collector)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def render():
+    """Renders every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items())
+        helps = dict(_help)
+
+    declared = set()
+    def declare(name, kind, help):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# HELP {name} {help or name}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        declare(name, 'counter', helps.get(name))
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), histogram in histograms:
+        declare(name, 'histogram', helps.get(name))
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    for collector in _collectors:
+        try:
+            for name, kind, help, samples in collector():
+                declare(name, kind, help)
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+        except Exception as e:
+            logger.error(f"Metrics collector failed: {e}")
+
+    return '\n'.join(lines) + '\n'
@@ -1,9 +1,53 @@
 from fpdf import FPDF
+from fpdf import fpdf as fpdf_module
 import os
+import base64
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules.cache import TieredCache, make_key
+from modules.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+FONTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fonts')
+DEFAULT_FONT = 'arial.ttf'
+# Fonts for scripts arial.ttf has no glyphs for, used when present in fonts/
+SCRIPT_FONTS = {
+    'Hindi': 'NotoSansDevanagari-Regular.ttf',
+    'Bengali': 'NotoSansBengali-Regular.ttf',
+    'Tamil': 'NotoSansTamil-Regular.ttf',
+    'Telugu': 'NotoSansTelugu-Regular.ttf',
+    'Malayalam': 'NotoSansMalayalam-Regular.ttf',
+}
+# Used in place of DEFAULT_FONT when fonts/ does not have it
+SYSTEM_FONTS = [
+    "C:\\Windows\\Fonts\\arial.ttf",
+    "C:\\Windows\\Fonts\\calibri.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+]
+
+# Bump when the report layout changes so cached reports are re-rendered
+REPORT_VERSION = '2'
+
+# Rendered reports by analysis id and language, base64 encoded
+report_cache = TieredCache(
+    'pdf_reports',
+    ttl=int(os.getenv("PDF_CACHE_TTL", 30 * 24 * 3600)),
+    max_memory_items=int(os.getenv("PDF_CACHE_MEMORY_ITEMS", 64)),
+    max_disk_items=int(os.getenv("PDF_CACHE_DISK_ITEMS", 10000)),
+)
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("PDF_WORKERS", 2)), thread_name_prefix='pdf')
+_pending = {}
+_pending_lock = threading.Lock()
+
+# Font metrics are parsed once per process and kept here rather than in
+# fpdf's pickle files next to the fonts
+fpdf_module.FPDF_CACHE_MODE = 1
+_fonts = {}
+_font_lock = threading.Lock()
+
 class PDF(FPDF):
     def header(self):
         try:
@@ -13,28 +57,102 @@ class PDF(FPDF):
         except Exception as e:
             logger.error(f"Header error: {e}")
 
+def _load_font(filename):
+    """
+    Returns the parsed fpdf entries for a TrueType font, or None if unusable.
+    Fonts are looked up and parsed on the first report that needs them.
+    """
+    with _font_lock:
+        if filename not in _fonts:
+            path = os.path.join(FONTS_DIR, filename)
+            if not os.path.isfile(path) and filename == DEFAULT_FONT:
+                path = next((font for font in SYSTEM_FONTS if os.path.isfile(font)), path)
+            _fonts[filename] = None
+            if os.path.isfile(path):
+                try:
+                    loader = FPDF()
+                    loader.add_font('Unicode', '', path, uni=True)
+                    _fonts[filename] = (loader.fonts['unicode'], loader.font_files['unicode'])
+                except Exception as e:
+                    logger.error(f"Could not load font {filename}: {e}")
+        return _fonts[filename]
+
+def _use_unicode_font(pdf, language):
+    """
+    Installs the language's TrueType font as the document's regular 'Arial'
+    from the per-process copy, so no font file is parsed per document.
+    Headings stay in the core bold font, which only ever shows ASCII labels.
+    Returns False if no TrueType font is available.
+    """
+    entry = None
+    if language in SCRIPT_FONTS:
+        entry = _load_font(SCRIPT_FONTS[language])
+    entry = entry or _load_font(DEFAULT_FONT)
+    if entry is None:
+        return False
+    font, font_file = entry
+    # fpdf maps the 'arial' family to 'helvetica'; each document gets its own
+    # subset list, the glyph widths are shared read-only
+    pdf.fonts['helvetica'] = dict(font, i=len(pdf.fonts) + 1, fontkey='helvetica',
+                                  subset=list(font['subset']))
+    pdf.font_files['helvetica'] = dict(font_file)
+    return True
+
+def report_key(result):
+    """Cache key and ETag of the report for a stored analysis result."""
+    return make_key(result['id'], result['language'], REPORT_VERSION)[:32]
+
+def get_report(result):
+    """Returns the PDF bytes for a stored analysis result, rendering it at most once."""
+    cached = report_cache.get(report_key(result))
+    if cached is not None:
+        return base64.b64decode(cached)
+    return prerender(result).result()
+
+def prerender(result):
+    """Renders and caches the report for result in the background; returns a Future."""
+    key = report_key(result)
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _pending[key] = _executor.submit(_render_and_store, key, result)
+    return future
+
+def _render_and_store(key, result):
+    try:
+        cached = report_cache.get(key)
+        if cached is not None:
+            return base64.b64decode(cached)
+        pdf_bytes = create_report(result['analysis'], result['url'], result['language'])
+        if pdf_bytes:
+            report_cache.set(key, base64.b64encode(pdf_bytes).decode('ascii'))
+        return pdf_bytes
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
 def create_report(analysis_data, url, language):
+    with timed('pdf_render'):
+        return _create_report(analysis_data, url, language)
+
+def _create_report(analysis_data, url, language):
     try:
         pdf = PDF()
         pdf.add_page()
         
-        # Try to set default font
-        try:
-            pdf.set_font('Arial', '', 12)
-        except Exception:
-            # Fallback to built-in font
-            pdf.set_font('Helvetica', '', 12)
+        # Use the bundled TrueType font so any language renders
+        unicode_font = _use_unicode_font(pdf, language)
+        pdf.set_font('Arial', '', 12)
+        bullet = '\u2022' if unicode_font else '-'
         
         # Function to safely handle text encoding
         def safe_text(text):
             if not text:
                 return ''
-            try:
-                # First try UTF-8
-                return text.encode('utf-8', errors='replace').decode('utf-8')
-            except:
-                # Fallback to latin-1
-                return text.encode('latin-1', errors='replace').decode('latin-1')
+            if unicode_font:
+                return text
+            # Core fonts only cover latin-1
+            return text.encode('latin-1', errors='replace').decode('latin-1')
         
         # URL Section
         pdf.set_font(pdf.font_family, 'B', 14)
@@ -65,7 +183,7 @@ def create_report(analysis_data, url, language):
         pdf.set_font(pdf.font_family, '', 12)
         risks = analysis_data.get('translated_key_risks', [])
         for risk in risks:
-            pdf.multi_cell(0, 10, f"• {safe_text(risk)}")
+            pdf.multi_cell(0, 10, f"{bullet} {safe_text(risk)}")
         
         # Generate PDF bytes
         try:
@@ -0,0 +1,153 @@
+from modules.scraper import find_policy_links, fetch_first_text, get_session, cached_discovery
+from modules.analyzer import analyze_policy_text, translate_analysis
+from modules.changes import load_snapshot, save_snapshot, fingerprint, describe_changes
+from modules.metrics import timed, inc
+from modules import prescreen
+from modules.results import save_result
+from modules.pdf_generator import prerender
+from urllib.parse import urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+def validate_url(url):
+    """Validate and clean URL"""
+    try:
+        result = urlparse(url)
+        if not result.scheme:
+            url = 'https://' + url
+        with timed('url_validation'):
+            response = get_session().head(url, allow_redirects=True, timeout=10)
+        return response.url
+    except Exception as e:
+        logger.error(f"URL validation error: {e}")
+        return None
+
+def run_analysis(url, language, progress=None, on_field=None):
+    """
+    Runs the full scrape-and-analyze pipeline for one website.
+    Returns the analysis data shown on the results page, or a dict with an
+    'error' message suitable for the user. progress, if given, is called
+    with a short description of each stage as it starts; on_field streams
+    analysis fields as the model produces them.
+    """
+    def report(stage):
+        if progress:
+            progress(stage)
+
+    # A site whose policy links are already known needs neither the
+    # validation request nor another homepage scan
+    discovered = cached_discovery(url)
+    if discovered:
+        valid_url = discovered['base_url']
+        policy_links = discovered['links']
+        logger.info(f"Using cached policy links for {valid_url}: {policy_links}")
+    else:
+        report("Validating URL")
+        valid_url = validate_url(url)
+        if not valid_url:
+            return {'error': "Invalid URL. Please enter a valid website address."}
+
+        report("Finding policy pages")
+        logger.info(f"Finding policy links for: {valid_url}")
+        policy_links = find_policy_links(valid_url, requested_url=url)
+        logger.info(f"Found policy links: {policy_links}")
+
+    if not policy_links:
+        logger.warning("No policy links found, using provided URL")
+        policy_links = [valid_url]
+
+    report("Extracting policy text")
+    screenings = {}
+
+    def accept(text):
+        # Link discovery also turns up help and accessibility pages; those
+        # are skipped here rather than sent to the model
+        screening = screenings[text] = prescreen.screen(text)
+        if not screening['is_policy']:
+            inc('policyguard_prescreen_rejected_total', help='Candidate pages rejected as not a policy')
+        return screening['is_policy']
+
+    policy_url, policy_text = fetch_first_text(policy_links, accept=accept if prescreen.PRESCREEN_ENABLED else None)
+    if not policy_text and screenings:
+        return {'error': "The pages found do not look like a privacy policy or terms of service. "
+                         "Please try the policy page's own URL."}
+    if not policy_text:
+        return {'error': "Could not extract policy text. Please check the website or try a different URL."}
+    logger.info(f"Extracted policy text from: {policy_url}")
+    screening = screenings.get(policy_text)
+
+    # An unchanged policy reuses its last analysis with no model call unless
+    # the prompt or model has changed since; a changed one is compared with
+    # it section by section
+    previous = load_snapshot(policy_url, language)
+    if previous and previous['fingerprint'] == fingerprint(policy_text):
+        logger.info(f"Policy at {policy_url} unchanged since last analysis")
+        analysis_result = previous['analysis']
+        if on_field:
+            for field, value in analysis_result.items():
+                on_field(field, value)
+        changes = {'changed': False}
+    else:
+        report("Analyzing policy")
+        analysis_text = policy_text
+        if screening:
+            # Shown until the model's own risk level arrives
+            if on_field and screening['provisional_risk']:
+                on_field('provisional_risk', screening['provisional_risk'])
+            analysis_text = screening['text']
+        logger.info(f"Analyzing text of length: {len(analysis_text)} (scraped {len(policy_text)})")
+        analysis_result = analyze_policy_text(analysis_text, language, on_field=on_field)
+
+        if 'error' in analysis_result:
+            return {'error': analysis_result['error']}
+        changes = describe_changes(previous, policy_text, analysis_result) if previous else None
+        save_snapshot(policy_url, language, policy_text, analysis_result)
+
+    result = {
+        'url': valid_url,
+        'language': language,
+        'analysis': {
+            'risk_category': analysis_result.get('risk_category', ''),
+            'translated_summary': analysis_result.get('translated_summary', ''),
+            'translated_key_risks': analysis_result.get('translated_key_risks', []),
+            # The English analysis, so other languages are a translation away
+            'summary': analysis_result.get('summary', ''),
+            'key_risks': analysis_result.get('key_risks', [])
+        }
+    }
+    if analysis_result.get('truncated'):
+        result['analysis']['truncated'] = True
+    if changes is not None:
+        result['changes'] = changes
+    result['id'] = save_result(result)
+    # Have the PDF report ready by the time the user asks for it
+    prerender(result)
+    return result
+
+def translate_result(result, languages):
+    """
+    Returns {language: stored result} with copies of a finished analysis in
+    each of languages, translating only its summary and key risks, or a dict
+    with an 'error' message.
+    """
+    analysis = result['analysis']
+    if 'summary' not in analysis:
+        return {'error': "This analysis predates language switching. Please analyze the website again."}
+    try:
+        translations = translate_analysis(analysis, languages)
+    except Exception as e:
+        logger.error(f"Translation error: {e}")
+        return {'error': "Could not translate this analysis. Please try again in a few minutes."}
+
+    translated = {}
+    for language, translation in translations.items():
+        copy = {
+            'url': result['url'],
+            'language': language,
+            'analysis': dict(analysis, **translation),
+        }
+        copy['id'] = save_result(copy)
+        prerender(copy)
+        translated[language] = copy
+    return translated
@@ -0,0 +1,185 @@
+import os
+import re
+import logging
+from modules.cache import normalize_text
+from modules.sections import SENTENCE_BOUNDARY
+from modules.metrics import inc, timed
+
+logger = logging.getLogger(__name__)
+
+PRESCREEN_ENABLED = os.getenv("POLICYGUARD_PRESCREEN", "1").lower() not in ('0', 'false', 'no')
+# Distinct clause categories and policy markers a page needs to count as a
+# policy. Help and accessibility pages found by link discovery often mention
+# the privacy policy or "your rights" once, but rarely several different ones
+MIN_POLICY_SIGNALS = int(os.getenv("PRESCREEN_MIN_POLICY_SIGNALS", 3))
+# The clause patterns and markers are English. Text in another language
+# (mostly non-Latin letters, or more common French, Spanish, German, Italian
+# or Portuguese words than English ones) is not judged by them: the page is
+# taken as a policy and no provisional risk is shown
+ENGLISH_WORDS = frozenset(
+    'the and of to you your we our or in for is are with this that by any may not'.split()
+)
+OTHER_WORDS = frozenset(
+    'le la les des et du vous nous est pour dans une el los las y que por para con der die das und sie '
+    'wir ist für mit il di che per della gli os da em não uma'.split()
+)
+MIN_NON_LATIN_SHARE = 0.3
+WORD = re.compile(r'\w+')
+# Repeated sentences at least this long are sent to the model once
+MIN_DEDUP_CHARS = 40
+
+# Clauses that make a policy risky, and how much each weighs towards the
+# provisional risk level (3 alone makes a policy High Risk)
+CLAUSE_PATTERNS = {
+    'data_selling': (3, [
+        r'sell (?:your |the )?(?:personal )?(?:data|information)', r'sale of (?:your )?personal',
+        r'(?:rent|trade) (?:your )?(?:personal )?(?:data|information)', r'data brokers?',
+    ]),
+    'content_license': (3, [
+        r'(?:perpetual|irrevocable|worldwide|royalty-free)[^.]{0,80}licen[cs]e',
+        r'licen[cs]e to (?:use|reproduce|modify|distribute)[^.]{0,40}(?:content|material)',
+    ]),
+    'arbitration': (2, [
+        r'binding arbitration', r'class action waiver', r'waive[^.]{0,40}(?:class action|jury trial)',
+        r'arbitration agreement',
+    ]),
+    'retention': (1, [
+        r'retain[^.]{0,60}(?:indefinitely|as long as (?:necessary|needed))',
+        r'(?:data|information) retention', r'stored indefinitely', r'retention period',
+    ]),
+    'tracking': (1, [
+        r'tracking (?:technologies|pixels?)', r'web beacons?', r'device fingerprint', r'cross-device',
+        r'track (?:you|your (?:activity|location))', r'precise (?:geo)?location',
+    ]),
+    'third_party_sharing': (1, [
+        r'share[^.]{0,60}(?:third parties|partners|affiliates|advertisers)',
+        r'disclose[^.]{0,60}(?:third parties|partners|affiliates)',
+    ]),
+}
+
+# Wording found in privacy policies and terms but rarely anywhere else
+POLICY_MARKERS = {
+    'personal_data': r'personal (?:data|information)', 'privacy_policy': r'privacy policy',
+    'terms': r'terms of (?:service|use)', 'we_collect': r'we (?:collect|process|store|share)',
+    'you_agree': r'you agree', 'by_using': r'by using (?:our|the|this)',
+    'cookies': r'cookie policy|use (?:of )?cookies', 'data_controller': r'data controller',
+    'governing_law': r'governing law', 'liability': r'limitation of liability',
+    'user_rights': r'your (?:rights|choices)', 'opt_out': r'opt[ -]out', 'regulation': r'gdpr|ccpa',
+}
+
+# Sentences that carry no policy content: page chrome, banners and footers.
+# A sentence must consist of one of these phrases, so policy sentences that
+# merely mention them ("when you sign up, we collect...") are kept
+BOILERPLATE_MAX_CHARS = 80
+BOILERPLATE = re.compile(
+    r'^\W*(?:(?:copyright\s*)?(?:©\s*)?(?:\d{4}\W*)?(?:[\w&.,-]+ ){0,4}all rights reserved'
+    r'|©\s*\d{4}(?:[\w&.,-]* ?){0,5}|skip to (?:main )?content|accept (?:all )?cookies|cookie settings'
+    r'|subscribe to (?:our )?newsletter|sign (?:in|up)|log in|back to top'
+    r'|follow us on(?: \w+){0,3}|share (?:this|on) (?:page|facebook|twitter)|print this page'
+    r'|was this (?:page|article) helpful\W*(?:yes\W*no)?|last updated:?)\W*$',
+    re.IGNORECASE
+)
+
+# A clause shortly after a negation ("we do not sell your personal
+# information", "we will never share it with advertisers") is a promise, not
+# a risk; it still counts as policy wording
+NEGATION_WINDOW = 40
+NEGATION = re.compile(
+    r"\b(?:not|never|no|nor|neither|cannot|(?:don|doesn|won)['’]t)\b(?:\W+\w+){0,5}\W*$",
+    re.IGNORECASE
+)
+
+# One alternation over every clause and marker; the named group that
+# matched tells which, so a page is scored in a single pass
+_CLAUSE_INDEX = re.compile(
+    '|'.join(f"(?P<{category}>{'|'.join(patterns)})"
+             for category, (_, patterns) in CLAUSE_PATTERNS.items()) +
+    ''.join(f"|(?P<{marker}>{pattern})" for marker, pattern in POLICY_MARKERS.items()),
+    re.IGNORECASE
+)
+
+def scan(text):
+    """
+    Returns {name: hits} for the clause categories and policy markers in
+    text; negated clauses are counted as 'negated_clause'.
+    """
+    hits = {}
+    for match in _CLAUSE_INDEX.finditer(text):
+        category = match.lastgroup
+        if category in CLAUSE_PATTERNS and _is_negated(text, match.start()):
+            category = 'negated_clause'
+        hits[category] = hits.get(category, 0) + 1
+    return hits
+
+def _is_negated(text, start):
+    """Whether a negation closely precedes position start, within its sentence."""
+    before = SENTENCE_BOUNDARY.split(text[max(0, start - NEGATION_WINDOW):start])[-1]
+    return NEGATION.search(before) is not None
+
+def provisional_risk(hits):
+    """Risk level implied by the clause categories present, before any model call."""
+    score = sum(CLAUSE_PATTERNS[category][0] for category in hits if category in CLAUSE_PATTERNS)
+    if score >= 3:
+        return 'High Risk'
+    if score >= 2:
+        return 'Medium Risk'
+    return 'Safe'
+
+def is_policy(hits):
+    """Whether text with these hits reads like a policy at all, e.g. not a help page."""
+    return len(hits) >= MIN_POLICY_SIGNALS
+
+def _is_boilerplate(sentence):
+    """Whether sentence is only page chrome; anything the clause index matches is kept."""
+    return (len(sentence) <= BOILERPLATE_MAX_CHARS and BOILERPLATE.match(sentence) is not None
+            and not _CLAUSE_INDEX.search(sentence))
+
+def strip_boilerplate(text):
+    """
+    Drops the sentences that are only page chrome, and repeats of sentences
+    already sent (notices restated per section, text duplicated by
+    responsive layouts). Everything else is kept, as sections with no clause
+    hits (security, policy changes, contact) are still part of what the
+    model is asked to judge.
+    """
+    seen = set()
+    kept = []
+    for sentence in SENTENCE_BOUNDARY.split(normalize_text(text)):
+        if _is_boilerplate(sentence):
+            continue
+        if len(sentence) >= MIN_DEDUP_CHARS:
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+        kept.append(sentence)
+    return ' '.join(kept)
+
+def is_english(text):
+    """Whether text can be judged by the English patterns, i.e. is not in another language."""
+    sample = text[:20000].lower()
+    letters = [char for char in sample if char.isalpha()]
+    if letters and sum(char > '\u024f' for char in letters) / len(letters) >= MIN_NON_LATIN_SHARE:
+        return False
+    words = WORD.findall(sample)
+    return sum(word in ENGLISH_WORDS for word in words) >= sum(word in OTHER_WORDS for word in words)
+
+def screen(text):
+    """
+    Scores policy text locally. Returns a dict with is_policy, the clause
+    hits, a provisional_risk level (None for text that is not English) and
+    the text to send to the model.
+    """
+    with timed('prescreen'):
+        hits = scan(text)
+        english = is_english(text)
+        result = {
+            'is_policy': is_policy(hits) or not english,
+            'clauses': {category: count for category, count in hits.items() if category in CLAUSE_PATTERNS},
+            'provisional_risk': provisional_risk(hits) if english else None,
+            'text': strip_boilerplate(text),
+        }
+    inc('policyguard_prescreen_chars_total', len(text), help='Policy text characters before and after pre-screening',
+        stage='scraped')
+    inc('policyguard_prescreen_chars_total', len(result['text']), help='Policy text characters before and after pre-screening',
+        stage='sent')
+    return result
@@ -0,0 +1,27 @@
+import os
+import json
+import logging
+from modules.cache import TieredCache, make_key
+
+logger = logging.getLogger(__name__)
+
+# Analyses shown to users, kept server-side so the session cookie only
+# carries an id and results can be shared by permalink across workers
+result_store = TieredCache(
+    'results',
+    ttl=int(os.getenv("RESULT_TTL", 30 * 24 * 3600)),
+    max_memory_items=int(os.getenv("RESULT_MEMORY_ITEMS", 512)),
+    max_disk_items=int(os.getenv("RESULT_DISK_ITEMS", 100000)),
+)
+
+def save_result(result):
+    """Stores result and returns its id; identical results share one id."""
+    analysis_id = make_key(json.dumps(result, sort_keys=True))[:24]
+    result_store.set(analysis_id, dict(result, id=analysis_id))
+    return analysis_id
+
+def load_result(analysis_id):
+    """Returns the stored result for analysis_id, or None if unknown or expired."""
+    if not analysis_id:
+        return None
+    return result_store.get(analysis_id)
@@ -1,6 +1,17 @@
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from modules.cache import TieredCache
+from modules.extractor import extract_text_stream, extract_pdf_text
+from modules.metrics import inc, timed, current_timings, request_timings
+from urllib.parse import urljoin, urlparse, urldefrag
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from collections import deque
+import os
+import codecs
+import threading
+import re
 import urllib3
 import logging
 
@@ -10,107 +21,366 @@ logger = logging.getLogger(__name__)
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# Update POLICY_KEYWORDS with more variations
-POLICY_KEYWORDS = [
-    'privacy', 'terms', 'cookie', 'legal', 'policy',
-    'disclaimer', 'notice', 'conditions', 'guidelines',
-    'copyright', 'accessibility', 'hyperlink', 'help',
-    'website policies', 'terms of use', 'terms of service',
-    'tos', 'eula', 'agreement', 'service terms',
-    'user agreement', 'community guidelines',
-    'privacy-policy', 'terms-of-service', 'terms-and-conditions',
-    'legal-notice', 'data-protection', 'data-privacy'
-]
-
-def find_policy_links(base_url):
-    """Scans a website's homepage to find links to policy pages."""
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+}
+
+# Connection pool sizing and per-host fan-out for candidate link fetching
+POOL_SIZE = 32
+MAX_FETCH_WORKERS = 16
+MAX_REQUESTS_PER_HOST = 4
+
+# Pages are streamed and parsed as they arrive; reading stops at this many
+# (decompressed) bytes, or once the policy text would fill every analysis
+# chunk anyway
+MAX_PAGE_BYTES = int(os.getenv("MAX_PAGE_BYTES", 5 * 1024 * 1024))
+MAX_POLICY_CHARS = int(os.getenv("MAX_POLICY_CHARS", 200000))
+READ_BLOCK_BYTES = 64 * 1024
+HTML_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+PDF_TYPES = ('application/pdf', 'application/x-pdf')
+CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+_session = None
+_session_lock = threading.Lock()
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+_fetch_pool = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix='policy-fetch')
+
+# Validators and extracted text of policy pages, so unchanged pages are
+# revalidated with a conditional GET instead of downloaded and parsed again
+page_cache = TieredCache(
+    'policy_pages',
+    ttl=int(os.getenv("PAGE_CACHE_TTL", 30 * 24 * 3600)),
+    max_memory_items=int(os.getenv("PAGE_CACHE_MEMORY_ITEMS", 128)),
+    max_disk_items=int(os.getenv("PAGE_CACHE_DISK_ITEMS", 10000)),
+)
+
+def get_session():
+    """Returns the process-wide keep-alive session shared by all fetches."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                session.verify = False
+                _session = session
+    return _session
+
+def _host_limit(url):
+    host = urlparse(url).netloc
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+        return _host_limits[host]
+
+# Policy keywords and how strongly each suggests a policy page. Hyphens and
+# underscores are matched as spaces, so 'privacy policy' also covers
+# '/privacy-policy' and '/privacy_policy'.
+POLICY_KEYWORD_WEIGHTS = {
+    'privacy policy': 10, 'privacy notice': 10, 'privacy statement': 10,
+    'terms of service': 9, 'terms of use': 9, 'terms and conditions': 9,
+    'privacy': 8, 'data protection': 7, 'data privacy': 7,
+    'user agreement': 7, 'terms': 6, 'service terms': 6, 'eula': 6,
+    'tos': 5, 'website policies': 5, 'cookie': 4, 'legal notice': 4,
+    'legal': 4, 'agreement': 4, 'policy': 3, 'policies': 3, 'conditions': 3,
+    'disclaimer': 2, 'notice': 2, 'community guidelines': 2,
+    'guidelines': 1, 'copyright': 1, 'accessibility': 1,
+    'hyperlink': 1, 'help': 1,
+}
+# Paths often run the words together ('/privacypolicy', '/TermsOfUse')
+POLICY_KEYWORD_WEIGHTS.update({keyword.replace(' ', ''): weight
+                               for keyword, weight in list(POLICY_KEYWORD_WEIGHTS.items()) if ' ' in keyword})
+POLICY_KEYWORDS = list(POLICY_KEYWORD_WEIGHTS)
+
+# One alternation over every keyword, longest first so 'privacy policy' wins
+# over 'privacy'; a keyword must not start or end mid-word ('tos' in
+# 'photos' or 'tostadas'), though a plural 's' may follow ('cookies')
+POLICY_PATTERN = re.compile(
+    r'(?<![a-z])(' +
+    '|'.join(re.escape(keyword) for keyword in sorted(POLICY_KEYWORDS, key=len, reverse=True)) +
+    r')s?(?![a-z])'
+)
+SEPARATORS = str.maketrans('-_', '  ')
+
+LINK_TAGS = SoupStrainer(['a', 'link', 'area'], href=True)
+
+# Paths probed directly when the homepage has no policy links
+WELL_KNOWN_PATHS = ['/privacy', '/privacy-policy', '/terms', '/legal']
+SITEMAP_DIRECTIVE = re.compile(r'^\s*sitemap:\s*(\S+)', re.IGNORECASE | re.MULTILINE)
+SITEMAP_LOC = re.compile(r'<loc>\s*([^<]+?)\s*</loc>', re.IGNORECASE)
+# Sitemaps can list every page of a site; only read the start of one, and
+# only take pages whose path names a policy outright
+SITEMAP_MAX_BYTES = 512 * 1024
+MIN_SITEMAP_SCORE = 4
+
+# Ranked policy links per site. Sites with none are remembered for a
+# shorter time, so a later fix on their side is picked up.
+discovery_cache = TieredCache(
+    'policy_links',
+    ttl=int(os.getenv("DISCOVERY_TTL", 7 * 24 * 3600)),
+    max_memory_items=int(os.getenv("DISCOVERY_MEMORY_ITEMS", 1024)),
+    max_disk_items=int(os.getenv("DISCOVERY_DISK_ITEMS", 100000)),
+)
+DISCOVERY_NEGATIVE_TTL = int(os.getenv("DISCOVERY_NEGATIVE_TTL", 24 * 3600))
+
+def _keyword_score(value):
+    """Weight of the strongest policy keyword in value, or 0."""
+    if not value:
+        return 0
+    matches = POLICY_PATTERN.findall(value.lower().translate(SEPARATORS))
+    return max((POLICY_KEYWORD_WEIGHTS[match] for match in matches), default=0)
+
+def discovery_key(url):
+    """Cache key for the links found from url: its host without www, plus any path."""
+    parsed = urlparse(url if '://' in url else f"https://{url}")
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/')}"
+
+def cached_discovery(url):
+    """Returns {'base_url', 'links'} from an earlier discovery for url's site, or None."""
+    return discovery_cache.get(discovery_key(url))
+
+def find_policy_links(base_url, requested_url=None):
+    """
+    Finds links to a website's policy pages, most relevant first. Links on
+    the homepage are used when it has any; otherwise well-known policy
+    paths, robots.txt and the sitemap are probed in parallel, and the
+    sitemap is used only when no probe finds a page. The result is cached
+    per domain, and also under requested_url (the address as typed, before
+    redirects).
+    """
+    key = discovery_key(base_url)
+    keys = {key, discovery_key(requested_url)} if requested_url else {key}
+    cached = discovery_cache.get(key)
+    if cached is not None:
+        logger.info(f"Using cached policy links for {key}")
+        return cached['links']
+
+    # Anchor text on the homepage is the strongest signal, so its links
+    # stand alone; probed pages are ranked by their path
+    links = _homepage_links(base_url)
+    ranked = links
+    if not links:
+        timings = current_timings()
+
+        def run(fn):
+            with request_timings(timings):
+                return fn(base_url)
+
+        probes = [_fetch_pool.submit(run, lambda url, path=path: _probe_path(url, path))
+                  for path in WELL_KNOWN_PATHS]
+        sitemap = _fetch_pool.submit(run, _sitemap_links)
+        extra = _best_scores(probe.result() for probe in probes)
+        if not extra:
+            extra = _best_scores([sitemap.result()])
+        ranked = sorted(extra, key=extra.get, reverse=True)
+
+    if ranked or links is not None:
+        # Without any links the homepage loaded but nothing looks like a policy
+        ttl = None if ranked else DISCOVERY_NEGATIVE_TTL
+        for cache_key in keys:
+            discovery_cache.set(cache_key, {'base_url': base_url, 'links': ranked}, ttl=ttl)
+    return ranked
+
+def _best_scores(results):
+    """Merges lists of (url, score) into {url: highest score}."""
+    scores = {}
+    for found in results:
+        for url, score in found:
+            scores[url] = max(score, scores.get(url, 0))
+    return scores
+
+def _homepage_links(base_url):
+    """Returns the ranked policy links on the homepage, or None if it failed to load."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-        }
-        
         logger.info(f"Fetching page: {base_url}")
-        response = requests.get(base_url, timeout=15, verify=False, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        links = set()
-        
-        # Look for links in common locations
-        for element in soup.find_all(['a', 'link', 'footer', 'nav', 'div']):
-            href = element.get('href', '')
-            if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
-                continue
-                
-            link_text = element.get_text().lower().strip()
-            title = element.get('title', '').lower()
-            aria_label = element.get('aria-label', '').lower()
-            
-            # Check all possible indicators
-            text_indicators = [link_text, title, aria_label, href.lower()]
-            if any(keyword in indicator for indicator in text_indicators 
-                  for keyword in POLICY_KEYWORDS):
-                try:
-                    full_url = urljoin(base_url, href)
-                    if urlparse(full_url).netloc == urlparse(base_url).netloc:
-                        links.add(full_url)
-                        logger.debug(f"Found policy link: {full_url}")
-                except Exception as e:
-                    logger.error(f"Error processing URL {href}: {e}")
-                    continue
-        
-        return list(links)
+        with timed('homepage_fetch'):
+            with get_session().get(base_url, timeout=15, stream=True) as response:
+                response.raise_for_status()
+                if _content_kind(response) != 'html':
+                    logger.warning(f"Homepage {base_url} is not HTML")
+                    return []
+                html = b''.join(_iter_body(response))
+        with timed('link_discovery'):
+            return extract_policy_links(html, response.url or base_url)
     except Exception as e:
         logger.error(f"Error finding policy links for {base_url}: {e}")
+        return None
+
+def _probe_path(base_url, path):
+    """Returns [(url, score)] if the well-known path exists on the site, else []."""
+    url = urljoin(base_url, path)
+    # A handful of short probes per cold domain; they do not take the
+    # host's slots, which the policy fetches that follow need
+    try:
+        with timed('well_known_probe'):
+            response = get_session().head(url, allow_redirects=True, timeout=5)
+    except requests.RequestException:
         return []
+    final = urlparse(response.url)
+    if response.status_code != 200 or final.netloc != urlparse(base_url).netloc:
+        return []
+    # Scored by where the probe landed: a redirect to the homepage or to an
+    # unrelated page is not a policy
+    score = _keyword_score(final.path)
+    if final.path in ('', '/') or not score:
+        return []
+    return [(urldefrag(response.url)[0], score)]
+
+def _sitemap_links(base_url):
+    """Returns (url, score) for policy-like pages listed in the site's sitemap."""
+    base_netloc = urlparse(base_url).netloc
+    sitemaps = []
+    with timed('sitemap_probe'):
+        robots = _read_limited(urljoin(base_url, '/robots.txt'))
+        if robots:
+            sitemaps = [match.strip() for match in SITEMAP_DIRECTIVE.findall(robots)]
+        sitemap = _read_limited(sitemaps[0] if sitemaps else urljoin(base_url, '/sitemap.xml'))
+
+    found = []
+    for url in SITEMAP_LOC.findall(sitemap or ''):
+        url = urldefrag(url.strip())[0]
+        score = _keyword_score(urlparse(url).path)
+        if score >= MIN_SITEMAP_SCORE and urlparse(url).netloc == base_netloc:
+            found.append((url, score))
+    return found
+
+def _read_limited(url, max_bytes=SITEMAP_MAX_BYTES):
+    """Returns up to max_bytes of a text resource, or None on any failure."""
+    try:
+        with get_session().get(url, timeout=5, stream=True) as response:
+            if response.status_code != 200:
+                return None
+            content = b''.join(_iter_body(response, max_bytes))
+        return content.decode(response.encoding or 'utf-8', errors='replace')
+    except requests.RequestException:
+        return None
+
+def _iter_body(response, max_bytes=MAX_PAGE_BYTES):
+    """Yields a streamed response's decompressed body in blocks, up to max_bytes."""
+    remaining = max_bytes
+    for block in response.iter_content(chunk_size=READ_BLOCK_BYTES):
+        yield block[:remaining]
+        remaining -= len(block)
+        if remaining <= 0:
+            logger.warning(f"{response.url} exceeds {max_bytes} bytes, reading only the start")
+            return
+
+def _content_kind(response):
+    """Classifies a response as 'html' or 'pdf' by its Content-Type, or None if unsupported."""
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type in PDF_TYPES:
+        return 'pdf'
+    if not content_type or content_type in HTML_TYPES or content_type == 'application/octet-stream':
+        return 'html'
+    return None
+
+def _declared_charset(response):
+    """
+    The charset named in the Content-Type header, or None. Unlike
+    response.encoding this is not ISO-8859-1 for text/html without one, so
+    the page is sniffed instead.
+    """
+    match = CHARSET.search(response.headers.get('Content-Type', ''))
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        return None
+
+def extract_policy_links(html, base_url):
+    """Returns same-site policy links in html, most relevant first."""
+    # Only elements carrying an href are parsed at all
+    soup = BeautifulSoup(html, 'html.parser', parse_only=LINK_TAGS)
+    base_netloc = urlparse(base_url).netloc
+    scores = {}
+
+    for element in soup.find_all(href=True):
+        href = element['href'].strip()
+        if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            continue
+
+        try:
+            score = (
+                _keyword_score(element.get_text(' ')) +
+                _keyword_score(element.get('title')) +
+                _keyword_score(element.get('aria-label')) +
+                _keyword_score(urlparse(href).path)
+            )
+            if not score:
+                continue
+            full_url = urldefrag(urljoin(base_url, href))[0]
+        except ValueError as e:
+            logger.error(f"Error processing URL {href}: {e}")
+            continue
+        if urlparse(full_url).netloc == base_netloc and score > scores.get(full_url, 0):
+            scores[full_url] = score
+
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    logger.debug(f"Ranked policy links: {[(url, scores[url]) for url in ranked]}")
+    return ranked
 
 def get_text_from_url(url, timeout=15):
     """Extracts all readable text content from a given URL."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
-        
         logger.info(f"Fetching content from: {url}")
-        response = requests.get(url, timeout=timeout, verify=False, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'iframe', 'noscript']):
-            element.decompose()
-        
-        # First try to find specific policy content
-        content_areas = soup.find_all(['main', 'article', 'div', 'section'], 
-            class_=lambda x: x and any(term in str(x).lower() 
-            for term in ['content', 'policy', 'terms', 'legal', 'agreement']))
-        
-        if content_areas:
-            logger.debug("Found specific policy content areas")
-            text = ' '.join(area.get_text() for area in content_areas)
-        else:
-            logger.debug("No specific policy content found, using main content")
-            # Try to find main content area
-            main_content = soup.find(['main', 'article', 'div[role="main"]'])
-            text = main_content.get_text() if main_content else soup.get_text()
-        
-        # Clean up the text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Additional cleanup
-        text = ' '.join(text.split())
+        cached = page_cache.get(url)
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        with _host_limit(url):
+            with timed('policy_fetch'):
+                response = get_session().get(url, timeout=timeout, headers=headers, stream=True)
+
+            with response:
+                if cached and response.status_code == 304:
+                    logger.info(f"{url} not modified, reusing its extracted text")
+                    inc('policyguard_policy_fetch_total', help='Policy page fetches by outcome', result='not_modified')
+                    return cached['text']
+                response.raise_for_status()
+
+                kind = _content_kind(response)
+                if kind is None:
+                    logger.warning(f"Skipping {url}: unsupported content type {response.headers.get('Content-Type')}")
+                    inc('policyguard_policy_fetch_total', help='Policy page fetches by outcome', result='unsupported')
+                    return None
+                inc('policyguard_policy_fetch_total', help='Policy page fetches by outcome', result='downloaded')
+
+                # The body is read while it is parsed, so this includes the download
+                with timed('text_extraction'):
+                    blocks = _iter_body(response)
+                    first = next(blocks, b'')
+                    # Servers often label PDFs as octet-stream or even HTML
+                    if first.startswith(b'%PDF-'):
+                        kind = 'pdf'
+                    blocks = chain([first], blocks)
+                    if kind == 'pdf':
+                        text = extract_pdf_text(b''.join(blocks), MAX_POLICY_CHARS)
+                    else:
+                        text = extract_text_stream(blocks, max_chars=MAX_POLICY_CHARS,
+                                                   encoding=_declared_charset(response))
         
-        if not text.strip():
+        if not text or not text.strip():
             logger.warning(f"No text content found at {url}")
             return None
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            page_cache.set(url, {'etag': etag, 'last_modified': last_modified, 'text': text})
             
         logger.info(f"Successfully extracted {len(text)} characters of text")
         return text
@@ -119,6 +389,44 @@ def get_text_from_url(url, timeout=15):
         logger.error(f"Error fetching text from {url}: {e}")
         return None
 
+def fetch_first_text(urls, timeout=15, accept=None):
+    """
+    Fetches candidate policy links in parallel and returns (url, text) for
+    the best-ranked one that yields text: a lower-ranked page is only used
+    once every link ranked above it has failed. accept, if given, is called
+    with each text and skips pages it rejects. At most MAX_REQUESTS_PER_HOST
+    candidates are in flight, the next one starting as an earlier one is
+    ruled out, so a homepage with many links does not fill the shared pool
+    with fetches waiting on one host.
+    """
+    timings = current_timings()
+
+    def fetch(url):
+        with request_timings(timings):
+            return get_text_from_url(url, timeout)
+
+    candidates = iter(urls)
+    window = deque()
+
+    def submit_next():
+        url = next(candidates, None)
+        if url is not None:
+            window.append((url, _fetch_pool.submit(fetch, url)))
+
+    for _ in range(MAX_REQUESTS_PER_HOST):
+        submit_next()
+    try:
+        while window:
+            url, future = window.popleft()
+            text = future.result()
+            if text and (accept is None or accept(text)):
+                return url, text
+            submit_next()
+    finally:
+        for _, future in window:
+            future.cancel()
+    return None, None
+
 def validate_url(url):
     """Validates and normalizes URLs."""
     try:
@@ -126,15 +434,7 @@ def validate_url(url):
         if not result.scheme:
             url = 'https://' + url
             
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.head(url, 
-                               allow_redirects=True, 
-                               timeout=10, 
-                               verify=False, 
-                               headers=headers)
+        response = get_session().head(url, allow_redirects=True, timeout=10)
         
         if response.status_code == 200:
             return response.url
@@ -0,0 +1,8 @@
+import re
+
+# Headings such as "4. Sharing", "4.2 Retention", "Section 7" or "ARTICLE IV"
+SECTION_BOUNDARY = re.compile(
+    r'(?=\b(?:\d{1,2}(?:\.\d{1,2})*\.?\s+[A-Z][a-z]'
+    r'|(?:Section|SECTION|Article|ARTICLE)\s+[0-9IVXLC]+\b))'
+)
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
@@ -0,0 +1,171 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from modules.cache import CACHE_DIR, TieredCache, make_key, normalize_text
+from modules.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+LANGUAGE_CODES = {
+    'English': 'en',
+    'Hindi': 'hi',
+    'Bengali': 'bn',
+    'Tamil': 'ta',
+    'Telugu': 'te',
+    'Malayalam': 'ml',
+    'Urdu': 'ur',
+    'French': 'fr',
+    'Russian': 'ru',
+    'Spanish': 'es',
+    'German': 'de'
+}
+
+# Texts are synthesized in sentence groups of about this many characters,
+# several groups at a time
+SEGMENT_CHARS = int(os.getenv("TTS_SEGMENT_CHARS", 300))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 8))
+
+AUDIO_DIR = os.path.join(CACHE_DIR, 'tts') if CACHE_DIR else ''
+AUDIO_CACHE_TTL = int(os.getenv("TTS_CACHE_TTL", 30 * 24 * 3600))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+# Sentence-ending punctuation, including Devanagari, Urdu and CJK full stops
+SENTENCE_END = re.compile(r'(?<=[.!?।۔。])\s+')
+
+_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix='tts')
+
+# Texts registered for playback by URL, so GET /audio/<key> can synthesize them
+text_cache = TieredCache('tts_texts', ttl=AUDIO_CACHE_TTL)
+
+def language_code(language):
+    return LANGUAGE_CODES.get(language, 'en')
+
+def audio_key(text, lang_code):
+    return make_key(normalize_text(text), lang_code, 'gtts')
+
+def register_text(text, lang_code):
+    """Remembers text for later synthesis and returns its audio key."""
+    key = audio_key(text, lang_code)
+    text_cache.set(key, {'text': text, 'lang': lang_code})
+    return key
+
+def registered_text(key):
+    entry = text_cache.get(key)
+    return (entry['text'], entry['lang']) if entry else (None, None)
+
+def cached_audio_path(key):
+    """Returns the path of cached audio for key, or None."""
+    if not AUDIO_DIR:
+        return None
+    path = os.path.join(AUDIO_DIR, f"{key}.mp3")
+    try:
+        if time.time() - os.path.getmtime(path) > AUDIO_CACHE_TTL:
+            os.remove(path)
+            return None
+        # Refresh the access time used for eviction
+        os.utime(path)
+        return path
+    except OSError:
+        return None
+
+def split_segments(text, max_chars=SEGMENT_CHARS):
+    """Groups sentences into segments of at most about max_chars."""
+    segments = []
+    current = ''
+    for sentence in SENTENCE_END.split(normalize_text(text)):
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        segments.append(current)
+    return segments
+
+def _synthesize(segment, lang_code):
+    # gTTS pulls in its HTTP stack; only processes that synthesize load it
+    from gtts import gTTS
+    with timed('tts_segment'):
+        audio_io = BytesIO()
+        gTTS(text=segment, lang=lang_code, slow=False, lang_check=False).write_to_fp(audio_io)
+        return audio_io.getvalue()
+
+def _submit_segments(text, lang_code):
+    return [_executor.submit(_synthesize, segment, lang_code)
+            for segment in split_segments(text)]
+
+def synthesize_stream(text, lang_code, key=None):
+    """
+    Synthesizes text segment by segment in parallel and yields the MP3 bytes
+    of each segment in order, so playback can start before synthesis ends.
+    The complete audio is written to the cache once every segment succeeds.
+    """
+    key = key or audio_key(text, lang_code)
+    futures = _submit_segments(text, lang_code)
+    parts = []
+    try:
+        for future in futures:
+            audio = future.result()
+            parts.append(audio)
+            yield audio
+    finally:
+        for future in futures:
+            future.cancel()
+
+    if len(parts) == len(futures):
+        _store(key, b''.join(parts))
+
+async def synthesize_stream_async(text, lang_code, key=None):
+    """Async counterpart of synthesize_stream; awaits segments without blocking the loop."""
+    key = key or audio_key(text, lang_code)
+    futures = _submit_segments(text, lang_code)
+    parts = []
+    try:
+        for future in futures:
+            audio = await asyncio.wrap_future(future)
+            parts.append(audio)
+            yield audio
+    finally:
+        for future in futures:
+            future.cancel()
+
+    if len(parts) == len(futures):
+        await asyncio.get_running_loop().run_in_executor(_executor, _store, key, b''.join(parts))
+
+def _store(key, audio):
+    if not AUDIO_DIR:
+        return
+    try:
+        os.makedirs(AUDIO_DIR, exist_ok=True)
+        path = os.path.join(AUDIO_DIR, f"{key}.mp3")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+        _evict()
+    except OSError as e:
+        logger.error(f"Could not cache audio {key}: {e}")
+
+def _evict():
+    """Drops expired audio, then least recently used files over the size cap."""
+    now = time.time()
+    files = []
+    for entry in os.scandir(AUDIO_DIR):
+        if not entry.name.endswith('.mp3'):
+            continue
+        stat = entry.stat()
+        if now - stat.st_mtime > AUDIO_CACHE_TTL:
+            os.remove(entry.path)
+        else:
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= AUDIO_CACHE_MAX_BYTES:
+            break
+        os.remove(path)
+        total -= size
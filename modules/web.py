@@ -0,0 +1,102 @@
+"""
+Request handling shared by the Flask app (app.py) and the async routes
+(asgi.py): response headers, the job event stream and streamed audio.
+Each server only turns these into its own response objects.
+"""
+import json
+import logging
+from modules import tts, metrics
+
+logger = logging.getLogger(__name__)
+
+SECURITY_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'SAMEORIGIN',
+    'X-XSS-Protection': '1; mode=block',
+}
+
+EVENT_STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+CACHED_AUDIO_HEADERS = {
+    'Cache-Control': 'public, max-age=86400, immutable',
+    'Accept-Ranges': 'bytes'
+}
+
+# Audio still being synthesized may end early if a later segment fails, so
+# it carries no ETag and is never cached; only the finished file is
+STREAMED_AUDIO_HEADERS = {
+    'Cache-Control': 'no-cache'
+}
+
+# Comment line keeps proxies from closing an idle stream
+KEEP_ALIVE = ': keep-alive\n\n'
+
+def _next_events(job, events, sent):
+    """Returns (text to send, events sent so far, whether the stream is done)."""
+    if not events and not job.finished:
+        return KEEP_ALIVE, sent, False
+    sent += len(events)
+    text = ''.join(f"event: {event}\ndata: {json.dumps(data)}\n\n" for event, data in events)
+    return text, sent, job.finished and sent >= len(job.events)
+
+def job_event_stream(job):
+    """Yields a job's events as Server-Sent Events until it finishes."""
+    sent, done = 0, False
+    while not done:
+        text, sent, done = _next_events(job, job.wait_for_events(sent), sent)
+        if text:
+            yield text
+
+async def job_event_stream_async(job):
+    """Async counterpart of job_event_stream."""
+    sent, done = 0, False
+    while not done:
+        text, sent, done = _next_events(job, await job.wait_for_events_async(sent), sent)
+        if text:
+            yield text
+
+def cached_audio(key):
+    """Returns the path of the cached audio for key, or None, counting hits and misses."""
+    path = tts.cached_audio_path(key)
+    metrics.inc('policyguard_tts_audio_total', help='Audio requests by audio cache result',
+                result='hit' if path else 'miss')
+    return path
+
+def audio_stream(text, lang_code, key):
+    """
+    Starts synthesizing text and returns an iterator over the MP3 bytes. The
+    first segment is synthesized before returning, so a failure raises here
+    while a 500 can still be sent; a later failure ends the stream.
+    """
+    stream = tts.synthesize_stream(text, lang_code, key)
+    first = next(stream, b'')
+
+    def generate():
+        yield first
+        try:
+            yield from stream
+        except Exception as e:
+            logger.error(f"TTS Error: {str(e)}")
+
+    return generate()
+
+async def audio_stream_async(text, lang_code, key):
+    """Async counterpart of audio_stream, returning an async iterator."""
+    stream = tts.synthesize_stream_async(text, lang_code, key)
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = b''
+
+    async def generate():
+        yield first
+        try:
+            async for segment in stream:
+                yield segment
+        except Exception as e:
+            logger.error(f"TTS Error: {str(e)}")
+
+    return generate()
@@ -0,0 +1,46 @@
+"""
+Production launcher: serves asgi:app with uvicorn.
+
+    python serve.py [--host 0.0.0.0] [--port 8000] [--workers 1] [--loop auto]
+
+Every option can also be set from the environment (HOST, PORT,
+WEB_CONCURRENCY, UVICORN_LOOP, UVICORN_HTTP, UVICORN_KEEP_ALIVE,
+UVICORN_LIMIT_CONCURRENCY, LOG_LEVEL); flags take precedence.
+"""
+import os
+import argparse
+import uvicorn
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument('--port', type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv("WEB_CONCURRENCY", 1)),
+                        help='worker processes; jobs and in-memory caches are per process')
+    parser.add_argument('--loop', default=os.getenv("UVICORN_LOOP", "auto"),
+                        choices=('auto', 'asyncio', 'uvloop'), help='event loop implementation')
+    parser.add_argument('--http', default=os.getenv("UVICORN_HTTP", "auto"),
+                        choices=('auto', 'h11', 'httptools'), help='HTTP protocol implementation')
+    parser.add_argument('--keep-alive', type=int, default=int(os.getenv("UVICORN_KEEP_ALIVE", 5)),
+                        help='seconds to keep idle connections open')
+    parser.add_argument('--limit-concurrency', type=int,
+                        default=int(os.getenv("UVICORN_LIMIT_CONCURRENCY", 0)) or None,
+                        help='maximum open connections per worker before answering 503')
+    parser.add_argument('--log-level', default=os.getenv("LOG_LEVEL", "info").lower())
+    args = parser.parse_args()
+
+    uvicorn.run(
+        'asgi:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        timeout_keep_alive=args.keep_alive,
+        limit_concurrency=args.limit_concurrency,
+        log_level=args.log_level,
+        proxy_headers=True,
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# Keep every cache in memory so importing the modules writes nothing to cache/
+os.environ.setdefault('POLICYGUARD_CACHE_DIR', '')
@@ -0,0 +1,63 @@
+import json
+import random
+from modules.analyzer import JsonFieldStream, split_into_chunks
+from modules.cache import normalize_text
+
+REPLY = ('```json\n{\n  "risk_category": "High Risk",\n'
+         '  "summary": "Sells data, says \\"trust us\\", and {braces} too.",\n'
+         '  "key_risks": ["Data is sold", "Arbitration, no class actions"],\n'
+         '  "score": 12,\n  "truncated": false\n}\n```')
+FIELDS = list(json.loads(REPLY.strip('`json\n')).items())
+
+def stream(pieces):
+    parser = JsonFieldStream()
+    return [field for piece in pieces for field in parser.feed(piece)]
+
+def test_json_field_stream_split_at_any_boundary():
+    for cut in range(len(REPLY) + 1):
+        assert stream([REPLY[:cut], REPLY[cut:]]) == FIELDS, cut
+
+def test_json_field_stream_split_into_random_pieces():
+    rng = random.Random(7)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(REPLY)), rng.randint(2, 30)))
+        pieces = [REPLY[start:end] for start, end in zip([0] + cuts, cuts + [len(REPLY)])]
+        assert stream(pieces) == FIELDS
+
+def test_json_field_stream_one_character_at_a_time():
+    assert stream(list(REPLY)) == FIELDS
+
+def test_json_field_stream_waits_for_the_end_of_a_number():
+    parser = JsonFieldStream()
+    assert parser.feed('{"score": 1') == []
+    assert parser.feed('2') == []
+    assert parser.feed('}') == [('score', 12)]
+
+def make_policy(sections=40, words=60):
+    return ' '.join(f"{index}. Heading {index} " + ' '.join(f"word{index}x{n}." for n in range(words))
+                    for index in range(1, sections + 1))
+
+def test_short_text_is_one_chunk():
+    assert split_into_chunks("1. Data  We collect\n little.") == ["1. Data We collect little."]
+    assert split_into_chunks("   ") == []
+
+def test_chunks_respect_the_size_limit_and_keep_all_text():
+    text = make_policy()
+    chunks = split_into_chunks(text, max_chars=2000)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 2000 for chunk in chunks)
+    assert ' '.join(chunks) == normalize_text(text)
+
+def test_oversized_section_is_split_by_sentences_then_cut():
+    text = "1. Everything " + "x" * 5000
+    chunks = split_into_chunks(text, max_chars=1000)
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert ''.join(chunks).replace(' ', '') == text.replace(' ', '')
+
+def test_editing_one_section_only_changes_nearby_chunks():
+    text = make_policy()
+    edited = text.replace("word20x5.", "word20x5 plus a new clause.")
+    before, after = split_into_chunks(text, max_chars=2000), split_into_chunks(edited, max_chars=2000)
+    # Boundaries resynchronize a few chunks after the edit
+    assert 0 < len(set(after) - set(before)) <= 4
+    assert after[:5] == before[:5] and after[-5:] == before[-5:]
@@ -0,0 +1,34 @@
+from modules.cache import TieredCache
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TieredCache('test_memory', max_memory_items=2, cache_dir='')
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.get_stats()['evictions'] == 1
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = TieredCache('test_disk', max_memory_items=0, max_disk_items=2, cache_dir=str(tmp_path))
+    cache.set('a', {'value': 1})
+    cache.set('b', {'value': 2})
+    # A disk hit counts as a use even before its access time is written
+    assert cache.get('a') == {'value': 1}
+    cache.set('c', {'value': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'value': 1} and cache.get('c') == {'value': 3}
+    assert cache.get_stats()['disk_items'] == 2
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    TieredCache('test_reopen', cache_dir=str(tmp_path)).set('a', [1, 2])
+    reopened = TieredCache('test_reopen', cache_dir=str(tmp_path))
+    assert reopened.get('a') == [1, 2]
+    assert reopened.get_stats()['disk_hits'] == 1
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = TieredCache('test_ttl', cache_dir=str(tmp_path))
+    cache.set('a', 1, ttl=-1)
+    assert cache.get('a') is None
+    assert cache.get_stats()['disk_items'] == 0
@@ -0,0 +1,21 @@
+from modules.changes import match_risks
+
+def test_reworded_risk_is_not_reported():
+    old = ["Your data is sold to third-party advertisers."]
+    new = ["Your personal data may be sold to third party advertisers."]
+    assert match_risks(old, new) == ([], [])
+
+def test_different_risks_in_non_latin_scripts_are_reported():
+    old = ["Ваши данные продаются третьим лицам без вашего согласия."]
+    new = ["Обязательный арбитраж лишает вас права на коллективный иск."]
+    assert match_risks(old, new) == (new, old)
+
+def test_reworded_risk_in_non_latin_script_is_not_reported():
+    old = ["Ваши данные продаются третьим лицам без вашего согласия."]
+    new = ["Ваши данные могут продаваться третьим лицам без согласия."]
+    assert match_risks(old, new) == ([], [])
+
+def test_devanagari_risks_are_compared():
+    old = ["आपका डेटा विज्ञापनदाताओं को बेचा जाता है।"]
+    new = ["अनिवार्य मध्यस्थता आपके मुकदमे के अधिकार को सीमित करती है।"]
+    assert match_risks(old, new) == (new, old)
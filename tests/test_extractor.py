@@ -0,0 +1,48 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from modules.extractor import ENGINES, extract_text_stream
+from modules.scraper import get_text_from_url
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'no-meta-charset.html')
+EXPECTED = ("Politique de confidentialité We’ll never sell your data — “promise”. "
+            "Données personnelles : nous conservons vos données pendant 12 mois. "
+            "Ваши данные не передаются третьим лицам. आपका डेटा सुरक्षित है।")
+
+with open(FIXTURE, 'rb') as f:
+    HTML = f.read()
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_undeclared_utf8_is_not_read_as_latin1(engine):
+    # Blocks split mid-character, as a streamed body can be
+    blocks = [HTML[start:start + 7] for start in range(0, len(HTML), 7)]
+    assert extract_text_stream(blocks, engine=engine) == EXPECTED
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_declared_charset_is_used(engine):
+    text = extract_text_stream([HTML.decode('utf-8').encode('utf-16')], engine=engine, encoding='utf-16')
+    assert text == EXPECTED
+
+@pytest.fixture
+def server():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            content_type = 'text/html; charset=utf-8' if self.path == '/declared' else 'text/html'
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(HTML)))
+            self.end_headers()
+            self.wfile.write(HTML)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+@pytest.mark.parametrize('path', ['/declared', '/undeclared'])
+def test_fetched_page_keeps_non_ascii_text(server, path):
+    assert get_text_from_url(server + path) == EXPECTED
@@ -0,0 +1,58 @@
+import pytest
+from modules.keypool import KeyPool, RateLimitError
+
+def make_pool(keys=('a', 'b', 'c'), **options):
+    options.setdefault('base_backoff', 0)
+    options.setdefault('max_wait', 0)
+    return KeyPool(list(keys), **options)
+
+def test_calls_are_spread_over_the_keys():
+    pool = make_pool(requests_per_minute=10)
+    used = [pool.call(lambda api_key: api_key) for _ in range(6)]
+    assert sorted(used) == ['a', 'a', 'b', 'b', 'c', 'c']
+
+def test_missing_keys_are_skipped():
+    assert len(make_pool(keys=('a', None, ''))) == 1
+
+def test_rate_limited_call_is_retried_on_another_key():
+    pool = make_pool()
+    calls = []
+
+    def fn(api_key):
+        calls.append(api_key)
+        if len(calls) == 1:
+            raise Exception("429 Resource has been exhausted")
+        return api_key
+
+    assert pool.call(fn) != calls[0]
+    throttled = [key['throttled'] for key in pool.metrics()]
+    assert sorted(throttled) == [0, 0, 1]
+
+def test_other_errors_propagate_without_retry():
+    pool = make_pool()
+    calls = []
+
+    def fn(api_key):
+        calls.append(api_key)
+        raise ValueError("bad reply")
+
+    with pytest.raises(ValueError):
+        pool.call(fn)
+    assert len(calls) == 1
+
+def test_exhausted_budgets_raise_rate_limit_error():
+    pool = make_pool(keys=('a',), requests_per_minute=2)
+    pool.call(lambda api_key: None)
+    pool.call(lambda api_key: None)
+    with pytest.raises(RateLimitError):
+        pool.call(lambda api_key: None)
+
+def test_token_budget_limits_large_calls():
+    pool = make_pool(keys=('a',), tokens_per_minute=1000)
+    pool.call(lambda api_key: None, estimated_tokens=900)
+    with pytest.raises(RateLimitError):
+        pool.call(lambda api_key: None, estimated_tokens=900)
+
+def test_no_keys_is_an_error():
+    with pytest.raises(RuntimeError):
+        make_pool(keys=()).call(lambda api_key: None)
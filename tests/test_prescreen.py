@@ -0,0 +1,52 @@
+from modules.prescreen import strip_boilerplate, scan, provisional_risk, is_policy, screen
+
+def test_clause_sentences_mentioning_chrome_survive():
+    text = ("When you sign up, we collect your email address and sell your data to partners. "
+            "Log in to your account to opt out of tracking pixels.")
+    assert strip_boilerplate(text) == text
+
+def test_page_chrome_is_dropped():
+    text = ("Skip to main content. Accept all cookies. We collect personal data to run the service. "
+            "Back to top. © 2024 Acme Inc. All rights reserved.")
+    assert strip_boilerplate(text) == "We collect personal data to run the service."
+
+def test_sections_without_clause_hits_are_kept():
+    text = ("4. Sharing We share your data with advertisers. "
+            "8. Security We take reasonable steps to protect it. "
+            "10. Changes to This Policy We may update this policy at any time. "
+            "13. See section 9 for details.")
+    assert strip_boilerplate(text) == text
+
+def test_negated_clauses_are_not_risks():
+    for text in ("We do not sell your personal information.",
+                 "We will never share your data with advertisers.",
+                 "We don’t rent your personal data or trade your information."):
+        assert provisional_risk(scan(text)) == 'Safe', text
+
+def test_clause_after_an_unrelated_negation_is_a_risk():
+    text = "We do not guarantee uptime. We sell your personal information to data brokers."
+    assert provisional_risk(scan(text)) == 'High Risk'
+
+def test_pages_that_only_mention_policies_are_not_policies():
+    for text in ("Help Center. Find answers to questions about orders, shipping and returns. "
+                 "For questions about our privacy policy, contact support.",
+                 "Accessibility Statement. We want everyone to be able to use our site. "
+                 "You can read about your rights under the ADA or contact us."):
+        assert not is_policy(scan(text)), text
+
+def test_short_policy_is_a_policy():
+    text = ("We collect personal information when you register. "
+            "You can opt out of marketing emails at any time.")
+    assert is_policy(scan(text))
+
+def test_repeated_sentences_are_sent_once():
+    notice = "Contact privacy@example.com with any questions about this section."
+    text = f"1. Data We collect your email address. {notice} 2. Sharing We share it with partners. {notice}"
+    assert strip_boilerplate(text) == (f"1. Data We collect your email address. {notice} "
+                                       "2. Sharing We share it with partners.")
+
+def test_policies_in_other_languages_are_not_judged_by_english_patterns():
+    for text in ("Мы собираем ваши персональные данные и передаём их партнёрам.",
+                 "Nous collectons vos données personnelles et les partageons avec nos partenaires."):
+        screening = screen(text)
+        assert screening['is_policy'] and screening['provisional_risk'] is None, text
@@ -0,0 +1,39 @@
+import time
+import threading
+from modules import scraper
+from modules.scraper import _keyword_score, extract_policy_links
+
+def test_keywords_do_not_match_inside_words():
+    for path in ('/photos', '/tostadas', '/legally-blonde'):
+        assert _keyword_score(path) == 0, path
+
+def test_keywords_match_plurals_and_run_together_paths():
+    assert _keyword_score('/cookies') == _keyword_score('/cookie')
+    assert _keyword_score('/privacypolicy') == _keyword_score('/privacy-policy')
+    assert _keyword_score('/termsofuse') == _keyword_score('/terms-of-use')
+
+def test_malformed_href_does_not_drop_other_links():
+    html = ('<a href="http://[bad/terms">Terms</a>'
+            '<a href="/tostadas">Tostadas</a>'
+            '<a href="/store/help/returns-policy">Returns</a>'
+            '<a href="/privacy">Privacy Policy</a>')
+    assert extract_policy_links(html, 'https://example.com/') == [
+        'https://example.com/privacy', 'https://example.com/store/help/returns-policy'
+    ]
+
+def test_fetch_first_text_keeps_few_candidates_in_flight(monkeypatch):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fake_fetch(url, timeout=15):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return 'policy text' if url.endswith('/12') else None
+
+    monkeypatch.setattr(scraper, 'get_text_from_url', fake_fetch)
+    urls = [f'https://example.com/{index}' for index in range(20)]
+    assert scraper.fetch_first_text(urls) == ('https://example.com/12', 'policy text')
+    assert peak[0] <= scraper.MAX_REQUESTS_PER_HOST